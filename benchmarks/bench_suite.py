@@ -0,0 +1,238 @@
+# Benchmark suite: ID extraction, tag query conversion, tag parsing and the
+# clipboard auto-load heuristic
+#
+# Inputs are synthetic and seeded, so runs are reproducible: 10 to 1,000,000
+# IDs in every bank's format with mixed separators and noise, and AnKing-style
+# tag sets read back through an in-memory SQLite cards/notes table. Each case
+# records throughput (best of --repeat runs) and peak traced memory (one extra
+# run under tracemalloc).
+#
+# Usage:
+#   python benchmarks/bench_suite.py                          # run and print
+#   python benchmarks/bench_suite.py --save benchmarks/baseline.json
+#   python benchmarks/bench_suite.py --compare benchmarks/baseline.json
+#
+# --compare exits with status 1 if any case is slower than the baseline by
+# more than --tolerance (default 25%). A full run takes a few minutes; use
+# --max-ids or --filter to narrow it.
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import core
+from bench_tag_parser import synthetic_note_tags
+
+SIZES = [10, 100, 1000, 10000, 100000, 1000000]
+# Clipboard checks only ever see clipboard-sized text; every case stays under
+# core.CLIPBOARD_MAX_CHARS (200 IDs is about 1,500 characters) so it times the
+# detector itself, not the early reject of longer text
+CLIPBOARD_SIZES = [10, 100, 200]
+# Characters of prose per clipboard "item", about the length of one ID and separator
+PROSE_CHARS_PER_ITEM = 7
+BANKS = ["UWorld", "AMBOSS", "COMLEX"]
+SEPARATORS = [", ", ",", "\n", "\t", " ", ",\n"]
+# Tokens a user might paste along with IDs (question prefixes, stray punctuation)
+NOISE_TOKENS = ["Q#", "(", ")", ".", "#", "id:", "•", ";"]
+AMBOSS_ALPHABET = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_"
+# Cases faster than this are repeated in a loop so timer resolution doesn't dominate
+MIN_RUN_SECONDS = 0.05
+PROSE_SAMPLE = (
+    "NEW in 1.4: What It Does - converts question IDs from your question bank "
+    "into Anki tag searches, see https://example.com for details. "
+)
+
+def random_id(rng, bank):
+    """One question ID in the given bank's format"""
+    if bank == "AMBOSS":
+        letter = rng.choice("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ")
+        rest = "".join(rng.choice(AMBOSS_ALPHABET) for _ in range(5))
+        position = rng.randrange(6)
+        return rest[:position] + letter + rest[position:]
+    if bank == "COMLEX":
+        return str(rng.randint(100000, 199999))
+    return str(rng.randint(1, 999999))
+
+def synthetic_ids_text(count, bank, noisy=False, seed=0):
+    """count IDs joined with mixed separators, optionally with noise tokens"""
+    rng = random.Random(f"{bank}-{count}-{noisy}-{seed}")
+    parts = []
+    for _ in range(count):
+        item = random_id(rng, bank)
+        if noisy and rng.random() < 0.2:
+            item = rng.choice(NOISE_TOKENS) + item
+        parts.append(item)
+        parts.append(rng.choice(SEPARATORS))
+        if noisy and rng.random() < 0.05:
+            parts.append(rng.choice(NOISE_TOKENS) + " ")
+    return "".join(parts)
+
+class SyntheticCollection:
+    """Just enough of a collection for iter_note_tags_for_cards: col.db.all"""
+    def __init__(self, note_tags):
+        self.db = self
+        self._conn = sqlite3.connect(":memory:")
+        self._conn.execute("create table notes (id integer primary key, tags text)")
+        self._conn.execute("create table cards (id integer primary key, nid integer)")
+        self._conn.executemany("insert into notes values (?, ?)", enumerate(note_tags, 1))
+        # Two cards per note, like a typical basic-and-reversed deck
+        self._conn.executemany(
+            "insert into cards values (?, ?)",
+            ((card_id, (card_id + 1) // 2) for card_id in range(1, 2 * len(note_tags) + 1))
+        )
+        self.card_ids = list(range(1, 2 * len(note_tags) + 1))
+
+    def all(self, sql, *args):
+        return self._conn.execute(sql, args).fetchall()
+
+def build_cases(max_items):
+    """(name, item count, setup, func) for every case up to max_items"""
+    cases = []
+    for size in SIZES:
+        if size > max_items:
+            continue
+        for bank in BANKS:
+            for noisy in (False, True):
+                label = "noisy" if noisy else "clean"
+                cases.append((
+                    f"extract/{bank}/{label}/{size}", size,
+                    lambda size=size, bank=bank, noisy=noisy: synthetic_ids_text(size, bank, noisy),
+                    lambda text, bank=bank: core.clean_and_extract_ids(text, bank)
+                ))
+            for compressed in (False, True):
+                label = "compressed" if compressed else "plain"
+                cases.append((
+                    f"convert/{bank}/{label}/{size}", size,
+                    lambda size=size, bank=bank: synthetic_ids_text(size, bank),
+                    lambda text, bank=bank, compressed=compressed: core.convert_ids_to_tags(
+                        text, "Step2", bank, compressed=compressed
+                    )
+                ))
+        cases.append((
+            f"parse_tags/{size}", size,
+            lambda size=size: synthetic_note_tags(size),
+            core.parse_question_ids_from_tags
+        ))
+        cases.append((
+            f"extract_from_cards/{size}", size,
+            lambda size=size: SyntheticCollection(synthetic_note_tags(size)),
+            lambda col: core.parse_question_ids_from_tags(
+                core.iter_note_tags_for_cards(col, col.card_ids)
+            )
+        ))
+    for size in CLIPBOARD_SIZES:
+        if size > max_items:
+            continue
+        for bank in BANKS:
+            cases.append((
+                f"clipboard/{bank}/{size}", size,
+                lambda size=size, bank=bank: synthetic_ids_text(size, bank),
+                core.looks_like_question_ids
+            ))
+        cases.append((
+            f"clipboard/prose/{size}", size,
+            lambda size=size: (PROSE_SAMPLE * (size // 10 + 1))[:size * PROSE_CHARS_PER_ITEM],
+            core.looks_like_question_ids
+        ))
+    return cases
+
+def time_calls(func, arg, number):
+    start = time.perf_counter()
+    for _ in range(number):
+        func(arg)
+    return time.perf_counter() - start
+
+def measure(items, setup, func, repeat):
+    """
+    Best per-call wall time over repeat runs, then peak traced memory of one
+    call. Fast cases are looped until a run takes at least MIN_RUN_SECONDS.
+    """
+    arg = setup()
+    number = 1
+    while time_calls(func, arg, number) < MIN_RUN_SECONDS:
+        number *= 10
+    best = min(time_calls(func, arg, number) for _ in range(repeat)) / number
+
+    tracemalloc.start()
+    func(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "items": items,
+        "seconds": best,
+        "items_per_s": items / best if best else None,
+        "peak_kib": round(peak / 1024, 1)
+    }
+
+def compare(results, baseline, tolerance):
+    """Print per-case ratios against a baseline; return the regressed case names"""
+    regressions = []
+    print(f"{'case':<36} {'baseline (s)':>13} {'now (s)':>12} {'ratio':>7} {'peak KiB':>10}")
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is None:
+            print(f"{name:<36} {'new':>13} {result['seconds']:>12.6f} {'':>7} {result['peak_kib']:>10}")
+            continue
+        ratio = result["seconds"] / old["seconds"] if old["seconds"] else 1.0
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  SLOWER"
+            regressions.append(name)
+        elif ratio < 1 / (1 + tolerance):
+            flag = "  faster"
+        print(f"{name:<36} {old['seconds']:>13.6f} {result['seconds']:>12.6f} {ratio:>6.2f}x "
+              f"{result['peak_kib']:>10}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the converter's core operations")
+    parser.add_argument("--max-ids", type=int, default=SIZES[-1],
+                        help="skip input sizes above this many IDs/tags")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--filter", default="", help="only run cases whose name contains this")
+    parser.add_argument("--save", metavar="PATH", help="write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown before --compare reports a regression")
+    args = parser.parse_args()
+
+    results = {}
+    for name, items, setup, func in build_cases(args.max_ids):
+        if args.filter not in name:
+            continue
+        results[name] = measure(items, setup, func, args.repeat)
+        if not args.compare:
+            result = results[name]
+            print(f"{name:<36} {result['seconds']:>12.6f}s {result['items_per_s']:>14,.0f}/s "
+                  f"{result['peak_kib']:>10} KiB")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({
+                "meta": {
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "repeat": args.repeat
+                },
+                "results": results
+            }, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            sys.exit(f"{len(regressions)} case(s) slower than baseline: {', '.join(regressions)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# Benchmark: tag parsing used by the Browser "Copy Question ID(s)" action
+#
+# Compares the compiled parser in core.py against the pre-1.5 parser (four
+# uncompiled re.search calls per tag, list membership dedup) on a synthetic
+# AnKing-style tag set, and checks both return identical results.
+#
+# Usage: python benchmarks/bench_tag_parser.py [--tags 100000] [--legacy-max 100000]
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import core
+
+# Tags that carry no question ID but are common on AnKing notes
+NOISE_TAGS = [
+    "#AK_Step1_v12::!FLAG_THIS_CARD",
+    "#AK_Step1_v12::#B&B::01_Biochem",
+    "#AK_Step2_v12::#OME::Cardio",
+    "#AK_Step1_v12::#Pathoma::Ch2_Inflammation",
+    "#AK_Step2_v12::^Other::Peds",
+    "marked",
+    "leech"
+]
+
+AMBOSS_ALPHABET = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_"
+
+def legacy_parse_question_ids(tag_strings):
+    """Parser as shipped up to 1.4.1, kept as the reference implementation"""
+    extracted_ids = {"UWorld": [], "AMBOSS": [], "COMLEX": []}
+    for tag_string in tag_strings:
+        for tag in tag_string.split():
+            uworld_match = re.search(r'#AK_Step[123]_v\d+::#UWorld::Step::(\d+)', tag)
+            if uworld_match:
+                if uworld_match.group(1) not in extracted_ids["UWorld"]:
+                    extracted_ids["UWorld"].append(uworld_match.group(1))
+                continue
+            uworld_step3_match = re.search(r'#AK_Step3_v\d+::#UWorld::(\d+)', tag)
+            if uworld_step3_match:
+                if uworld_step3_match.group(1) not in extracted_ids["UWorld"]:
+                    extracted_ids["UWorld"].append(uworld_step3_match.group(1))
+                continue
+            amboss_match = re.search(r'#AK_Step[12]_v\d+::#AMBOSS::([a-zA-Z0-9\-_]+)', tag)
+            if amboss_match:
+                if amboss_match.group(1) not in extracted_ids["AMBOSS"]:
+                    extracted_ids["AMBOSS"].append(amboss_match.group(1))
+                continue
+            comlex_match = re.search(r'#AK_Step[12]_v\d+::#UWorld::COMLEX::(\d+)', tag)
+            if comlex_match:
+                if comlex_match.group(1) not in extracted_ids["COMLEX"]:
+                    extracted_ids["COMLEX"].append(comlex_match.group(1))
+                continue
+    return extracted_ids
+
+def random_question_tag(rng):
+    """One AnKing question-bank tag for a random bank and step"""
+    kind = rng.randrange(4)
+    if kind == 0:
+        return f"#AK_Step{rng.choice('12')}_v12::#UWorld::Step::{rng.randint(1, 999999)}"
+    if kind == 1:
+        return f"#AK_Step3_v12::#UWorld::{rng.randint(1, 999999)}"
+    if kind == 2:
+        amboss_id = "".join(rng.choice(AMBOSS_ALPHABET) for _ in range(6))
+        return f"#AK_Step{rng.choice('12')}_v12::#AMBOSS::{amboss_id}"
+    return f"#AK_Step{rng.choice('12')}_v12::#UWorld::COMLEX::{rng.randint(100000, 199999)}"
+
+def synthetic_note_tags(tag_count, seed=0):
+    """
+    Note tag strings (as stored in the notes table) adding up to roughly
+    tag_count tags: each note has 1-3 question tags and 1-2 noise tags.
+    """
+    rng = random.Random(seed)
+    notes = []
+    total = 0
+    while total < tag_count:
+        tags = [random_question_tag(rng) for _ in range(rng.randint(1, 3))]
+        tags += rng.sample(NOISE_TAGS, rng.randint(1, 2))
+        total += len(tags)
+        notes.append(" " + " ".join(tags) + " ")
+    return notes
+
+def best_of(func, arg, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(arg)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark question-ID tag parsing")
+    parser.add_argument("--tags", type=int, default=100000, help="largest tag set size")
+    parser.add_argument("--legacy-max", type=int, default=100000,
+                        help="skip the quadratic legacy parser above this size")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    sizes = [size for size in (1000, 10000, args.tags) if size <= args.tags]
+    print(f"{'tags':>8} {'legacy (s)':>12} {'compiled (s)':>13} {'speedup':>8} {'ids':>8}")
+    for size in sorted(set(sizes)):
+        notes = synthetic_note_tags(size)
+        new_time, new_result = best_of(core.parse_question_ids_from_tags, notes, args.repeat)
+        id_count = sum(len(ids) for ids in new_result.values())
+
+        if size <= args.legacy_max:
+            old_time, old_result = best_of(legacy_parse_question_ids, notes, 1)
+            if old_result != new_result:
+                sys.exit(f"Result mismatch at {size} tags")
+            print(f"{size:>8} {old_time:>12.4f} {new_time:>13.4f} {old_time / new_time:>7.1f}x {id_count:>8}")
+        else:
+            print(f"{size:>8} {'skipped':>12} {new_time:>13.4f} {'':>8} {id_count:>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+# UWorld AMBOSS COMLEX - Question ID Converter, command line
+#
+# Converts question IDs to Anki search queries (or cleaned ID lists) outside
+# Anki, with the same ID extraction and tag patterns as the add-on. Input is
+# streamed from files or stdin and output is written in batches, so memory
+# stays flat however long the input is (--unique and --compressed keep
+# more: a set of seen IDs, a batch of IDs per regex term). With --jobs N,
+# up to N files are read at a time and each one's IDs are held until its
+# turn to be written, so memory follows the N largest files, not the total.
+#
+# Usage:
+#   python cli.py ids.txt                               # UWorld Step 2 query
+#   cat ids.txt | python cli.py --bank AMBOSS --step Step1
+#   python cli.py --bank UWorld+AMBOSS mixed.txt        # one query for both banks
+#   python cli.py --output ids --unique exports/*.csv   # every cell, delimiter detected
+#   python cli.py --output ids --csv-column 0 exports/*.csv
+#   python cli.py --csv-column 1 --csv-delimiter ";" --header yes export.csv
+#   python cli.py --pattern "tag:#MyDeck::{ID}" ids.txt
+#   python cli.py --pattern AMBOSS_Step2="tag:#Mine::{ID}" --bank UWorld+AMBOSS ids.txt
+#   python cli.py --jobs 4 exports/*.txt                # read files in 4 processes
+#
+# Exits with status 1 if no IDs were found (or none have a tag pattern for
+# the chosen step), 2 on invalid options.
+
+import argparse
+import csv
+import io
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+try:
+    from . import core
+except ImportError:
+    import core
+
+BANKS = ["UWorld", "AMBOSS", "COMLEX", *core.MIXED_BANKS]
+STEPS = ["Step1", "Step2", "Step3"]
+PATTERN_KEYS = {f"{bank}_{step}" for bank in ("UWorld", "AMBOSS", "COMLEX") for step in STEPS}
+# IDs rendered per write; compressed output gets one regex term per batch
+OUTPUT_BATCH_SIZE = core.COMPRESSED_TERM_MAX_IDS
+
+def open_input(path):
+    """Text stream for a path, "-" being stdin"""
+    if path == "-":
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig", errors="replace")
+    return open(path, "r", encoding="utf-8-sig", errors="replace", newline="")
+
+def iter_file_ids(path, bank, csv_options=None, as_csv=None):
+    """
+    Stream the IDs of one input like the add-on's file import
+    (core.iter_ids_from_file): .csv/.tsv files, or any input if as_csv, are
+    read as CSV with csv_options (column, delimiter, skip_header), None
+    meaning every cell or detected per file. Stdin can't be sniffed: it is
+    read as text unless as_csv, then with "," and no header by default.
+    """
+    if path != "-":
+        yield from core.iter_ids_from_file(path, bank, csv_options, as_csv)
+        return
+    with open_input(path) as stream:
+        if not as_csv:
+            yield from core.iter_ids_from_stream(stream, bank)
+            return
+        column, delimiter, skip_header = csv_options or (None, None, None)
+        yield from core.iter_ids_from_csv(stream, bank, column, delimiter or ",", bool(skip_header))
+
+def read_file_ids(path, bank, csv_options=None, as_csv=None):
+    """All IDs of one file as a list (run in a worker process by --jobs)"""
+    return list(iter_file_ids(path, bank, csv_options, as_csv))
+
+def iter_input_ids(paths, bank, csv_options=None, as_csv=None, jobs=1):
+    """
+    IDs of every input in order. With jobs > 1 files are read and scanned in
+    a process pool, one file per task, and their IDs come back in file order.
+    Only jobs files are in flight at a time, so finished files don't pile up
+    while an earlier one is still being read or written.
+    """
+    if jobs > 1 and len(paths) > 1 and "-" not in paths:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            pending = deque()
+            remaining = iter(paths)
+            for path in remaining:
+                pending.append(executor.submit(read_file_ids, path, bank, csv_options, as_csv))
+                if len(pending) == jobs:
+                    break
+            while pending:
+                ids = pending.popleft().result()
+                path = next(remaining, None)
+                if path is not None:
+                    pending.append(executor.submit(read_file_ids, path, bank, csv_options, as_csv))
+                yield from ids
+                del ids
+        return
+    for path in paths:
+        yield from iter_file_ids(path, bank, csv_options, as_csv)
+
+def iter_unique(ids):
+    seen = set()
+    for question_id in ids:
+        if question_id not in seen:
+            seen.add(question_id)
+            yield question_id
+
+def parse_patterns(values, bank, step_type):
+    """
+    --pattern values as custom_patterns. A bare pattern applies to the
+    chosen bank and step; KEY=PATTERN (e.g. AMBOSS_Step2=...) to any other.
+    """
+    custom_patterns = {}
+    for value in values:
+        key, separator, pattern = value.partition("=")
+        if key not in PATTERN_KEYS:
+            if bank in core.MIXED_BANKS:
+                raise ValueError(
+                    "With a mixed bank, name the pattern's bank and step: "
+                    f"--pattern AMBOSS_{step_type}=PATTERN"
+                )
+            key, pattern = f"{bank}_{step_type}", value
+        errors = core.validate_tag_pattern(pattern)
+        if errors:
+            raise ValueError(f"Invalid pattern for {key}: {'; '.join(errors)}")
+        custom_patterns[key] = pattern
+    return custom_patterns
+
+def write_output(ids, out, output="query", step_type="Step2", bank="UWorld",
+                 custom_patterns=None, compressed=False):
+    """
+    Write IDs (any iterable) as one OR query, or one ID per line, a batch at
+    a time. Returns the number of IDs that made it into the output.
+    """
+    build_query = core.build_compressed_tag_query if compressed else core.build_tag_query
+    ids = iter(ids)
+    written = 0
+    while True:
+        batch = list(islice(ids, OUTPUT_BATCH_SIZE))
+        if not batch:
+            break
+        if output == "ids":
+            out.write("\n".join(batch) + "\n")
+            written += len(batch)
+            continue
+        query = build_query(batch, step_type, bank, custom_patterns)
+        if not query:
+            # No tag pattern for these IDs' bank on this step
+            continue
+        if written:
+            out.write(" OR ")
+        out.write(query)
+        written += len(batch)
+    if output == "query" and written:
+        out.write("\n")
+    return written
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Convert question IDs to Anki search queries (same rules as the add-on)"
+    )
+    parser.add_argument("files", nargs="*", default=["-"],
+                        help="files to read IDs from (default: stdin; - also means stdin)")
+    parser.add_argument("--bank", choices=BANKS, default="UWorld",
+                        help="question bank; UWorld+AMBOSS / COMLEX+AMBOSS sort mixed input by ID format")
+    parser.add_argument("--step", choices=STEPS, default="Step2")
+    parser.add_argument("--pattern", action="append", default=[], metavar="[BANK_STEP=]PATTERN",
+                        help="custom tag pattern with an {ID} placeholder (repeatable)")
+    parser.add_argument("--output", choices=["query", "ids"], default="query",
+                        help="an Anki search query, or the cleaned IDs one per line")
+    parser.add_argument("--compressed", action="store_true",
+                        help="compact tag:re: query (one regex term per batch of IDs)")
+    parser.add_argument("--unique", action="store_true", help="drop repeated IDs")
+    parser.add_argument("--csv-column", type=int, metavar="N",
+                        help="read inputs as CSV, IDs from column N (0-based; default: every cell)")
+    parser.add_argument("--csv-delimiter", help="read inputs as CSV with this delimiter "
+                        "(default: detected per file)")
+    parser.add_argument("--header", choices=["auto", "yes", "no"], default="auto",
+                        help="read inputs as CSV; whether they start with a header row "
+                        "(default: detected per file)")
+    parser.add_argument("--jobs", type=int, default=1, metavar="N",
+                        help="read files in N worker processes")
+    args = parser.parse_args(argv)
+
+    # Mixed banks too: their AMBOSS IDs have no Step 3 tags and would be dropped
+    if args.step == "Step3" and args.bank != "UWorld":
+        parser.error(f"Step 3 is not available for {args.bank}")
+    try:
+        custom_patterns = parse_patterns(args.pattern, args.bank, args.step)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # .csv/.tsv files are read as CSV anyway; any CSV option applies it to every input
+    skip_header = {"auto": None, "yes": True, "no": False}[args.header]
+    csv_options = (args.csv_column, args.csv_delimiter, skip_header)
+    as_csv = True if csv_options != (None, None, None) else None
+    ids = iter_input_ids(args.files, args.bank, csv_options, as_csv, args.jobs)
+    if args.unique:
+        ids = iter_unique(ids)
+    try:
+        written = write_output(
+            ids, sys.stdout, args.output, args.step, args.bank, custom_patterns, args.compressed
+        )
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        sys.exit(f"error: {e}")
+    if not written:
+        sys.exit("No question IDs found")
+
+if __name__ == "__main__":
+    main()
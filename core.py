@@ -0,0 +1,1435 @@
+# UWorld AMBOSS COMLEX - Question ID Converter for Anki
+# Qt-free core logic: importable and benchmarkable without a running Anki
+
+import csv
+import hashlib
+import json
+import os
+import re
+import time
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+
+# Stable API shared by the add-on UI and headless tools; everything else here is private
+__all__ = [
+    "SEARCH_CHUNK_SIZE",
+    "CLIPBOARD_MAX_CHARS",
+    "CLIPBOARD_MAX_TOKENS",
+    "FILE_READ_CHUNK_SIZE",
+    "EXTRACT_BATCH_SIZE",
+    "CSV_DELIMITERS",
+    "COMPRESSED_TERM_MAX_IDS",
+    "ID_SCANNERS",
+    "MIXED_BANKS",
+    "bank_components",
+    "split_ids_by_bank",
+    "QUESTION_TAG_RE",
+    "iter_ids",
+    "clean_and_extract_ids",
+    "looks_like_question_ids",
+    "iter_ids_from_stream",
+    "iter_ids_from_csv",
+    "sniff_csv",
+    "IMPORT_FILE_SUFFIXES",
+    "iter_ids_from_file",
+    "read_ids_from_file",
+    "expand_import_paths",
+    "import_id_files",
+    "get_tag_pattern",
+    "ID_PLACEHOLDER",
+    "PatternTemplate",
+    "validate_tag_pattern",
+    "compile_tag_pattern",
+    "get_tag_template",
+    "convert_ids_to_tags",
+    "build_tag_query",
+    "split_tag_pattern",
+    "build_compressed_tag_query",
+    "resolve_ids_to_note_ids",
+    "find_cards_in_chunks",
+    "count_cards_of_notes",
+    "iter_note_tags_for_cards",
+    "parse_question_tag",
+    "parse_question_ids_from_tags",
+    "coverage_summary",
+    "QUESTION_INDEX_PREFIXES",
+    "QuestionIndex",
+    "read_question_index_notes",
+    "TIMING_LOG_SIZE",
+    "TimingLog",
+    "TOKEN_CHUNK_SIZE",
+    "IdTokenModel",
+    "QUERY_PREVIEW_CHARS",
+    "query_term_count",
+    "query_preview",
+    "CONVERSION_CACHE_BYTES",
+    "ConversionCache",
+    "HISTORY_MAX_ENTRIES",
+    "HISTORY_MAX_BYTES",
+    "make_history_entry",
+    "HistoryStore"
+]
+
+# Search chunk size used by find_cards_in_chunks
+SEARCH_CHUNK_SIZE = 500
+# Characters read per chunk when streaming IDs from a file
+FILE_READ_CHUNK_SIZE = 64 * 1024
+# Cards whose note tags are fetched per query in extract_question_ids
+EXTRACT_BATCH_SIZE = 2000
+# CSV delimiters offered in the import dialog
+CSV_DELIMITERS = {"Comma": ",", "Semicolon": ";", "Tab": "\t", "Pipe": "|"}
+# Stage timings kept for the diagnostics view (oldest are dropped first)
+TIMING_LOG_SIZE = 200
+# IdTokenModel keeps the input in chunks of about this many characters
+TOKEN_CHUNK_SIZE = 4096
+# Longer queries are shown as a head/tail preview (see query_preview)
+QUERY_PREVIEW_CHARS = 20000
+# Memory budget of ConversionCache (approximate bytes of cached IDs and queries)
+CONVERSION_CACHE_BYTES = 32 * 1024 * 1024
+# Files read at once by import_id_files, and the files it picks up from folders
+IMPORT_MAX_WORKERS = 4
+IMPORT_FILE_SUFFIXES = (".txt", ".csv", ".tsv")
+# Conversion history retention: newest entries kept when the log is compacted
+HISTORY_MAX_ENTRIES = 5000
+HISTORY_MAX_BYTES = 64 * 1024 * 1024
+# Characters of the ID list shown for each history entry
+HISTORY_PREVIEW_CHARS = 50
+
+# Precompiled ID scanners. A token is any run of characters between separators
+# (comma, space, tab, newline); tokens are then cleaned according to the bank.
+_TOKEN_RE = re.compile(r'[^,\s]+')
+_NON_DIGIT_RE = re.compile(r'\D')
+_AMBOSS_INVALID_RE = re.compile(r'[^a-zA-Z0-9\-_]')
+_AMBOSS_LETTER_RE = re.compile(r'[a-zA-Z]')
+# Fast path: token is already a clean AMBOSS ID (valid charset, at least one letter)
+_AMBOSS_CLEAN_ID_RE = re.compile(r'[a-zA-Z0-9\-_]*[a-zA-Z][a-zA-Z0-9\-_]*')
+
+def _scan_numeric_ids(text):
+    """UWorld, COMLEX: keep only the digits of each token"""
+    for match in _TOKEN_RE.finditer(text):
+        item = match.group()
+        if item.isdecimal():
+            yield item
+            continue
+        clean_id = _NON_DIGIT_RE.sub('', item)
+        if clean_id:  # Only yield if we have a valid ID
+            yield clean_id
+
+def _scan_amboss_ids(text):
+    """AMBOSS: keep alphanumeric, hyphens and underscores; require a letter"""
+    for match in _TOKEN_RE.finditer(text):
+        item = match.group()
+        if _AMBOSS_CLEAN_ID_RE.fullmatch(item):
+            yield item
+            continue
+        clean_id = _AMBOSS_INVALID_RE.sub('', item)
+        # AMBOSS IDs must contain at least one letter (not pure numbers)
+        if clean_id and _AMBOSS_LETTER_RE.search(clean_id):
+            yield clean_id
+
+def _scan_mixed_ids(text):
+    """
+    Mixed input, one pass: a token that has a letter once cleaned the AMBOSS
+    way is an AMBOSS ID, anything else keeps its digits (UWorld/COMLEX)
+    """
+    for match in _TOKEN_RE.finditer(text):
+        item = match.group()
+        if item.isdecimal() or _AMBOSS_CLEAN_ID_RE.fullmatch(item):
+            yield item
+            continue
+        clean_id = _AMBOSS_INVALID_RE.sub('', item)
+        if clean_id and _AMBOSS_LETTER_RE.search(clean_id):
+            yield clean_id
+            continue
+        clean_id = _NON_DIGIT_RE.sub('', item)
+        if clean_id:
+            yield clean_id
+
+# Mixed-bank modes and the bank their all-digit IDs belong to
+MIXED_BANKS = {
+    "UWorld+AMBOSS": "UWorld",
+    "COMLEX+AMBOSS": "COMLEX"
+}
+
+# Bank-specific scanners (banks not listed use the numeric scanner)
+ID_SCANNERS = {
+    "UWorld": _scan_numeric_ids,
+    "AMBOSS": _scan_amboss_ids,
+    "COMLEX": _scan_numeric_ids,
+    "UWorld+AMBOSS": _scan_mixed_ids,
+    "COMLEX+AMBOSS": _scan_mixed_ids
+}
+
+def bank_components(bank):
+    """The single banks a (possibly mixed) bank converts to"""
+    if bank in MIXED_BANKS:
+        return [MIXED_BANKS[bank], "AMBOSS"]
+    return [bank]
+
+def split_ids_by_bank(ids, bank):
+    """
+    [(bank, ids)] per single bank, in bank_components order. IDs of a mixed
+    bank are classified the way _scan_mixed_ids produced them: AMBOSS IDs
+    are the ones with a letter.
+    """
+    if bank not in MIXED_BANKS:
+        return [(bank, ids if isinstance(ids, list) else list(ids))]
+    numeric_ids = []
+    amboss_ids = []
+    for question_id in ids:
+        if _AMBOSS_LETTER_RE.search(question_id):
+            amboss_ids.append(question_id)
+        else:
+            numeric_ids.append(question_id)
+    return [(MIXED_BANKS[bank], numeric_ids), ("AMBOSS", amboss_ids)]
+
+def iter_ids(text, bank="UWorld"):
+    """
+    Lazily yield cleaned IDs from text in a single pass.
+    Same rules and order as clean_and_extract_ids, without building a list.
+    """
+    return ID_SCANNERS.get(bank, _scan_numeric_ids)(text)
+
+def clean_and_extract_ids(text, bank="UWorld"):
+    """
+    Extract IDs from text with support for multiple formats:
+    - Comma-separated: 1234, 5678, 9012
+    - Space-separated: 1234 5678 9012
+    - Newline-separated: one ID per line
+    - Tab-separated: 1234\t5678\t9012
+    - Mixed formats
+
+    For AMBOSS, supports alphanumeric IDs with hyphens and underscores:
+    - -aaDMQ, 0jae_4, 3_0SLi
+    """
+    return list(iter_ids(text, bank))
+
+# Clipboard auto-load: only short text is considered, and only its first tokens
+CLIPBOARD_MAX_CHARS = 2000
+CLIPBOARD_MAX_TOKENS = 100
+# Text containing any of these (case-insensitive) reads like a document, not IDs
+_CLIPBOARD_SKIP_MARKERS = [
+    '<b>', '<i>', '<a>', 'http', 'www.', '@', 'README', 'NEW in', 
+    'What It Does', 'Features:', 'Requirements:', 'I am', 'I will',
+    'the ', 'and ', 'for ', 'with ', 'that ', 'this ', 'have ',
+    'Step 1', 'Step 2', 'Step 3', 'question bank'
+]
+_CLIPBOARD_MARKER_RE = re.compile("|".join(re.escape(marker.lower()) for marker in _CLIPBOARD_SKIP_MARKERS))
+_CLIPBOARD_SPLIT_RE = re.compile(r'[,\s\n\t]+')
+# Pure digits, or AMBOSS-style with a dash/underscore
+_CLIPBOARD_ID_RE = re.compile(r'\d+|[\-_][a-zA-Z0-9]{3,}|[a-zA-Z0-9]{2,}[\-_][a-zA-Z0-9]+')
+_CLIPBOARD_ID_MAX_LENGTH = 10
+# Deletes the characters that count as "numeric" content (ASCII text only)
+_DROP_NUMERIC_CHARS = str.maketrans('', '', '0123456789 \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f,-_')
+
+def _strip_bounded(text, limit):
+    """
+    text.strip() if the result is shorter than limit, else None. Only the
+    ends of a long text are inspected, so a huge clipboard isn't copied.
+    """
+    head = text[:limit]
+    leading = len(head) - len(head.lstrip())
+    tail = text[-limit:]
+    trailing = len(tail) - len(tail.rstrip())
+    if leading == len(head) or trailing == len(tail):
+        # An end is all whitespace for limit characters: rare, do it the slow way
+        stripped = text.strip()
+        return stripped if len(stripped) < limit else None
+    if len(text) - leading - trailing >= limit:
+        return None
+    return text[leading:len(text) - trailing]
+
+def looks_like_question_ids(text):
+    """
+    Clipboard auto-load heuristic: True if text reads like a short list of
+    question IDs rather than prose, markup or links.
+    
+    At most CLIPBOARD_MAX_CHARS characters are examined, cheapest checks
+    first, and the token check stops as soon as the answer is certain.
+    """
+    text = _strip_bounded(text, CLIPBOARD_MAX_CHARS)
+    if not text:
+        return False
+    
+    # Skip if text contains common document/text markers
+    if _CLIPBOARD_MARKER_RE.search(text.lower()):
+        return False
+    
+    # More than 80% of the first tokens must look like IDs
+    parts = _CLIPBOARD_SPLIT_RE.split(text, CLIPBOARD_MAX_TOKENS)[:CLIPBOARD_MAX_TOKENS]
+    total_parts = len(parts) - parts.count('')
+    if not total_parts:
+        return False
+    bad_parts = 0
+    for part in parts:
+        if not part:
+            continue
+        if len(part) > _CLIPBOARD_ID_MAX_LENGTH or not _CLIPBOARD_ID_RE.fullmatch(part):
+            bad_parts += 1
+            if bad_parts * 5 >= total_parts:
+                return False
+    
+    # Mostly digits and separators: long lines and many spaces are fine
+    if text.isascii():
+        numeric_chars = len(text) - len(text.translate(_DROP_NUMERIC_CHARS))
+    else:
+        numeric_chars = sum(c.isdigit() or c.isspace() or c in ',-_' for c in text)
+    if numeric_chars / len(text) > 0.85:
+        return True
+    
+    # Otherwise skip text that is too "wordy" (more than 15% spaces) or has
+    # prose-length lines (average over 100 characters)
+    if text.count(' ') / len(text) > 0.15:
+        return False
+    line_count = text.count('\n') + 1
+    return (len(text) - (line_count - 1)) / line_count <= 100
+
+def iter_ids_from_stream(stream, bank="UWorld", chunk_size=FILE_READ_CHUNK_SIZE):
+    """
+    Yield IDs from a text stream (e.g. an open file), reading it in
+    fixed-size chunks so memory use doesn't grow with the file size.
+    """
+    carry = ""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        text = carry + chunk
+        # Hold back a trailing token that may continue in the next chunk
+        end = len(text)
+        while end and text[end - 1] != "," and not text[end - 1].isspace():
+            end -= 1
+        carry = text[end:]
+        yield from iter_ids(text[:end], bank)
+    if carry:
+        yield from iter_ids(carry, bank)
+
+def iter_ids_from_csv(stream, bank="UWorld", column=None, delimiter=",", skip_header=False):
+    """
+    Yield IDs from CSV rows as they are read.
+    column: index of the column holding the IDs (None = every cell)
+    """
+    reader = csv.reader(stream, delimiter=delimiter)
+    if skip_header:
+        next(reader, None)
+    for row in reader:
+        if column is None:
+            cells = row
+        elif column < len(row):
+            cells = (row[column],)
+        else:
+            continue
+        for cell in cells:
+            yield from iter_ids(cell, bank)
+
+def sniff_csv(file_path, sample_size=FILE_READ_CHUNK_SIZE):
+    """
+    Guess delimiter and header from the start of a CSV file.
+    Returns (delimiter, has_header).
+    """
+    with open(file_path, 'r', encoding='utf-8-sig', newline='') as f:
+        sample = f.read(sample_size)
+    
+    # Drop the last, possibly cut-off line
+    if len(sample) == sample_size and "\n" in sample:
+        sample = sample[:sample.rindex("\n") + 1]
+    
+    try:
+        sniffer = csv.Sniffer()
+        delimiter = sniffer.sniff(sample, delimiters="".join(CSV_DELIMITERS.values())).delimiter
+        has_header = sniffer.has_header(sample)
+    except csv.Error:
+        delimiter, has_header = ",", False
+    return delimiter, has_header
+
+def iter_ids_from_file(file_path, bank="UWorld", csv_options=None, as_csv=None):
+    """
+    Stream the IDs of one text or CSV file. It is read as CSV if as_csv is
+    true or, by default, if it is a .csv/.tsv file: with csv_options
+    (column, delimiter, skip_header), where a None column means every cell
+    and a None delimiter or skip_header is guessed for this file by
+    sniff_csv. No csv_options means every cell, both guessed.
+    """
+    if as_csv is None:
+        as_csv = file_path.lower().endswith((".csv", ".tsv"))
+    if not as_csv:
+        with open(file_path, 'r', encoding='utf-8-sig') as f:
+            yield from iter_ids_from_stream(f, bank)
+        return
+    column, delimiter, skip_header = csv_options or (None, None, None)
+    if delimiter is None or skip_header is None:
+        sniffed_delimiter, has_header = sniff_csv(file_path)
+        delimiter = delimiter or sniffed_delimiter
+        skip_header = has_header if skip_header is None else skip_header
+    with open(file_path, 'r', encoding='utf-8-sig', newline='') as f:
+        yield from iter_ids_from_csv(f, bank, column, delimiter, skip_header)
+
+def read_ids_from_file(file_path, bank="UWorld", csv_options=None):
+    """All IDs of one text or CSV file as a list, see iter_ids_from_file"""
+    return list(iter_ids_from_file(file_path, bank, csv_options))
+
+def expand_import_paths(paths, suffixes=IMPORT_FILE_SUFFIXES):
+    """Files to import: each file as given, each folder's matching files (recursively, sorted)"""
+    files = []
+    for path in paths:
+        if not os.path.isdir(path):
+            files.append(path)
+            continue
+        for root, dirs, names in os.walk(path):
+            dirs.sort()
+            files.extend(
+                os.path.join(root, name) for name in sorted(names)
+                if name.lower().endswith(suffixes) and not name.startswith(".")
+            )
+    return files
+
+def import_id_files(paths, bank="UWorld", csv_options=None, max_workers=IMPORT_MAX_WORKERS,
+                    on_progress=None, should_cancel=None):
+    """
+    Read many ID files in a thread pool and merge them.
+    
+    Returns (ids_by_bank, file_results, cancelled). ids_by_bank maps each
+    bank of bank_components(bank) to its IDs deduplicated across all files,
+    in file order. file_results has one {"path", "count", "error"} per path,
+    in the order given; a file that can't be read gets its error and no IDs.
+    on_progress(done, total) is called from the calling thread after each
+    file; should_cancel is checked as well and drops the remaining files.
+    """
+    total = len(paths)
+    file_ids = [None] * total
+    file_results = [{"path": path, "count": 0, "error": None} for path in paths]
+    cancelled = False
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, total or 1)))
+    try:
+        futures = {
+            executor.submit(read_ids_from_file, path, bank, csv_options): i
+            for i, path in enumerate(paths)
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            i = futures[future]
+            try:
+                file_ids[i] = future.result()
+                file_results[i]["count"] = len(file_ids[i])
+            except (OSError, UnicodeDecodeError, csv.Error) as e:
+                file_results[i]["error"] = str(e)
+            if on_progress:
+                on_progress(done, total)
+            if should_cancel and should_cancel():
+                cancelled = True
+                break
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    
+    ids_by_bank = {component: {} for component in bank_components(bank)}
+    for ids in file_ids:
+        if ids:
+            for group_bank, group_ids in split_ids_by_bank(ids, bank):
+                ids_by_bank[group_bank].update(dict.fromkeys(group_ids))
+    return {group_bank: list(ids) for group_bank, ids in ids_by_bank.items()}, file_results, cancelled
+
+def get_tag_pattern(step_type, bank="UWorld", custom_patterns=None):
+    """
+    Get the tag pattern for a specific step type and question bank
+    Supports custom patterns defined by user
+    
+    Banks: UWorld, AMBOSS, COMLEX
+    """
+    # Check for custom patterns first
+    pattern_key = f"{bank}_{step_type}"
+    if custom_patterns and pattern_key in custom_patterns:
+        return custom_patterns[pattern_key]
+    
+    # Default patterns by bank
+    if bank == "AMBOSS":
+        if step_type == "Step1":
+            return "tag:#AK_Step1_v12::#AMBOSS::{ID}"
+        elif step_type == "Step2":
+            return "tag:#AK_Step2_v12::#AMBOSS::{ID}"
+        else:
+            # Step 3 not supported for AMBOSS
+            return None
+    
+    elif bank == "COMLEX":
+        if step_type == "Step1":
+            return "tag:#AK_Step1_v12::#UWorld::COMLEX::{ID}"
+        elif step_type == "Step2":
+            return "tag:#AK_Step2_v12::#UWorld::COMLEX::{ID}"
+        else:
+            # Step 3 not supported for COMLEX
+            return None
+    
+    else:  # UWorld (default)
+        if step_type == "Step1":
+            return "tag:#AK_Step1_v12::#UWorld::Step::{ID}"
+        elif step_type == "Step3":
+            return "tag:#AK_Step3_v12::#UWorld::{ID}"
+        else:  # Step2 (default)
+            return "tag:#AK_Step2_v12::#UWorld::Step::{ID}"
+
+def convert_ids_to_tags(ids_text, step_type="Step2", bank="UWorld", custom_patterns=None, compressed=False):
+    """
+    Convert IDs to Anki search format with custom pattern support
+    Supports multiple question banks: UWorld, AMBOSS, COMLEX
+    With compressed=True, emits tag:re: searches (see build_compressed_tag_query)
+    """
+    # Extract and clean IDs from text (bank-aware)
+    if compressed:
+        return build_compressed_tag_query(iter_ids(ids_text, bank), step_type, bank, custom_patterns)
+    return build_tag_query(iter_ids(ids_text, bank), step_type, bank, custom_patterns)
+
+# Placeholder replaced by the question ID in tag patterns (case-sensitive)
+ID_PLACEHOLDER = "{ID}"
+_ANY_CASE_PLACEHOLDER_RE = re.compile(r'\{\s*id\s*\}', re.IGNORECASE)
+# Compiled patterns by pattern text; custom patterns rarely change
+_compiled_tag_patterns = {}
+_COMPILED_TAG_PATTERNS_MAX = 64
+
+class PatternTemplate:
+    """
+    A tag pattern compiled into the literal text around its {ID}
+    placeholders (one or more). Rendering joins that text with the IDs
+    instead of searching and replacing in the pattern for every ID.
+    Create these with compile_tag_pattern, which validates and caches.
+    """
+    
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.parts = pattern.split(ID_PLACEHOLDER)
+    
+    @property
+    def placeholder_count(self):
+        return len(self.parts) - 1
+    
+    def render(self, question_id):
+        """The pattern for one ID"""
+        return question_id.join(self.parts)
+    
+    def render_all(self, ids, separator=" OR "):
+        """
+        Every ID rendered and joined with separator, i.e.
+        separator.join(map(self.render, ids)). With a single placeholder this
+        is one str.join: prefix + (suffix + separator + prefix).join(ids) + suffix.
+        """
+        ids = ids if isinstance(ids, list) else list(ids)
+        if not ids:
+            return ""
+        if len(self.parts) == 2:
+            prefix, suffix = self.parts
+            return prefix + (suffix + separator + prefix).join(ids) + suffix
+        return separator.join(question_id.join(self.parts) for question_id in ids)
+
+def validate_tag_pattern(pattern):
+    """Problems with a tag pattern as a list of messages (empty if it's usable)"""
+    errors = []
+    if ID_PLACEHOLDER not in pattern:
+        miscased = _ANY_CASE_PLACEHOLDER_RE.search(pattern)
+        if miscased:
+            errors.append(f"The placeholder is case-sensitive: write {ID_PLACEHOLDER} instead of {miscased.group()}")
+        else:
+            errors.append(f"Missing the {ID_PLACEHOLDER} placeholder (every ID would produce the same search)")
+    if pattern.count('"') % 2:
+        errors.append('Unbalanced double quote (")')
+    if pattern.count("(") != pattern.count(")"):
+        errors.append("Unbalanced parentheses")
+    return errors
+
+def compile_tag_pattern(pattern):
+    """
+    The PatternTemplate for a tag pattern, compiled on first use and cached.
+    Raises ValueError listing the problems if the pattern is invalid.
+    """
+    template = _compiled_tag_patterns.get(pattern)
+    if template is None:
+        errors = validate_tag_pattern(pattern)
+        if errors:
+            raise ValueError(f"Invalid tag pattern {pattern}: " + "; ".join(errors))
+        if len(_compiled_tag_patterns) >= _COMPILED_TAG_PATTERNS_MAX:
+            _compiled_tag_patterns.clear()
+        template = _compiled_tag_patterns[pattern] = PatternTemplate(pattern)
+    return template
+
+def get_tag_template(step_type, bank="UWorld", custom_patterns=None):
+    """Compiled get_tag_pattern (None where the bank has no such step)"""
+    tag_pattern = get_tag_pattern(step_type, bank, custom_patterns)
+    if tag_pattern is None:
+        return None
+    return compile_tag_pattern(tag_pattern)
+
+def build_tag_query(ids, step_type="Step2", bank="UWorld", custom_patterns=None):
+    """
+    Build the Anki search query for already extracted IDs.
+    Accepts any iterable of IDs (list or iter_ids generator).
+    A mixed bank gives one query OR-ing each bank's terms.
+    """
+    if bank in MIXED_BANKS:
+        queries = (
+            build_tag_query(group_ids, step_type, group_bank, custom_patterns)
+            for group_bank, group_ids in split_ids_by_bank(ids, bank) if group_ids
+        )
+        return " OR ".join(query for query in queries if query)
+    
+    # Get the compiled tag pattern for this step and bank
+    template = get_tag_template(step_type, bank, custom_patterns)
+
+    if template is None:
+        return ""
+
+    # Substitute each ID for the {ID} placeholder(s) and join with OR
+    return template.render_all(ids)
+
+def query_term_count(query):
+    """Number of OR-joined terms in a query built by this module"""
+    return query.count(" OR ") + 1 if query else 0
+
+def query_preview(query, max_chars=QUERY_PREVIEW_CHARS):
+    """
+    The query itself if it has at most max_chars characters, otherwise its
+    first and last terms (about max_chars in total) around a line giving
+    the full length and term count. Only the head and tail are copied.
+    """
+    if len(query) <= max_chars:
+        return query
+    half = max_chars // 2
+    # Cut on term boundaries so no term is shown half
+    head_end = query.rfind(" OR ", 0, half)
+    if head_end < 0:
+        head_end = half
+    tail_start = query.find(" OR ", len(query) - half)
+    tail_start = len(query) - half if tail_start < 0 else tail_start + len(" OR ")
+    hidden_terms = max(query.count(" OR ", head_end, tail_start) - 1, 0)
+    return (
+        f"{query[:head_end]}\n\n"
+        f"... {hidden_terms:,} more terms not shown (full query: {len(query):,} characters, "
+        f"{query_term_count(query):,} terms; Copy and Search use all of it) ...\n\n"
+        f"{query[tail_start:]}"
+    )
+
+# Characters that make a tag search more than a literal tag name
+_NON_LITERAL_TAG_RE = re.compile(r'[\s"*\\()]')
+
+def split_tag_pattern(tag_pattern):
+    """
+    Split a plain "tag:<prefix>{ID}<suffix>" pattern into (prefix, suffix).
+    Returns None if the pattern is anything other than a single literal tag
+    search (other search terms, wildcards, regex, several placeholders).
+    """
+    if not tag_pattern or not tag_pattern.lower().startswith("tag:"):
+        return None
+    tag = tag_pattern[len("tag:"):]
+    if tag.lower().startswith("re:") or tag.count("{ID}") != 1:
+        return None
+    if _NON_LITERAL_TAG_RE.search(tag):
+        return None
+    prefix, suffix = tag.split("{ID}")
+    return prefix, suffix
+
+# IDs per tag:re: term; keeps each regex well below Anki's regex size limit
+COMPRESSED_TERM_MAX_IDS = 2000
+
+# Anki evaluates tag:re: with Rust regex syntax, case-insensitively, per tag
+_TAG_REGEX_META_RE = re.compile(r'([\\.+*?()|\[\]{}^$])')
+_TAG_REGEX_CLASS_META_RE = re.compile(r'([\\\]\[^\-])')
+
+def _escape_tag_regex(text):
+    return _TAG_REGEX_META_RE.sub(r'\\\1', text)
+
+def _ids_to_trie_regex(ids):
+    """
+    Build a regex alternation matching exactly the given IDs, with shared
+    leading characters factored out (21656|21657 -> 2165[67]).
+    """
+    trie = {}
+    for question_id in ids:
+        node = trie
+        for char in question_id:
+            node = node.setdefault(char, {})
+        node[""] = None
+    return _trie_node_regex(trie) or ""
+
+def _trie_node_regex(node):
+    """Regex for the suffixes below a trie node (None if it only ends here)"""
+    branches = []
+    single_chars = []
+    for char in sorted(key for key in node if key):
+        # Collapse chains of single-child nodes into one literal run
+        literal = char
+        child = node[char]
+        while len(child) == 1 and "" not in child:
+            (next_char, child), = child.items()
+            literal += next_char
+        rest = _trie_node_regex(child)
+        if rest is None and len(literal) == 1:
+            single_chars.append(char)
+        elif rest is None:
+            branches.append(_escape_tag_regex(literal))
+        else:
+            branches.append(_escape_tag_regex(literal) + rest)
+    
+    # IDs that differ only in their last character share a character class
+    if len(single_chars) == 1:
+        branches.append(_escape_tag_regex(single_chars[0]))
+    elif single_chars:
+        branches.append("[" + _TAG_REGEX_CLASS_META_RE.sub(r'\\\1', "".join(single_chars)) + "]")
+    
+    if not branches:
+        return None
+    if len(branches) == 1:
+        regex = branches[0]
+        optional_needs_group = len(regex) > 1 and not regex.startswith("[")
+    else:
+        regex = "(?:" + "|".join(branches) + ")"
+        optional_needs_group = False
+    
+    # The ID may also end at this node
+    if "" in node:
+        regex = f"(?:{regex})?" if optional_needs_group else regex + "?"
+    return regex
+
+def build_compressed_tag_query(ids, step_type="Step2", bank="UWorld", custom_patterns=None):
+    """
+    Build a compact query: the shared tag prefix is written once per
+    "tag:re:" term, followed by a trie-shaped alternation of the sorted IDs.
+    Each term matches the same tags (and child tags) as the plain tag:
+    searches would. Patterns that aren't a single literal tag: term fall
+    back to build_tag_query. A mixed bank gets one set of terms per bank.
+    """
+    if bank in MIXED_BANKS:
+        queries = (
+            build_compressed_tag_query(group_ids, step_type, group_bank, custom_patterns)
+            for group_bank, group_ids in split_ids_by_bank(ids, bank) if group_ids
+        )
+        return " OR ".join(query for query in queries if query)
+    
+    tag_pattern = get_tag_pattern(step_type, bank, custom_patterns)
+    split = split_tag_pattern(tag_pattern)
+    if split is None:
+        return build_tag_query(ids, step_type, bank, custom_patterns)
+    
+    prefix, suffix = split
+    unique_ids = sorted(set(ids))
+    prefix_regex = _escape_tag_regex(prefix)
+    suffix_regex = _escape_tag_regex(suffix) + "(?:::|$)"
+    
+    terms = []
+    for start in range(0, len(unique_ids), COMPRESSED_TERM_MAX_IDS):
+        chunk = unique_ids[start:start + COMPRESSED_TERM_MAX_IDS]
+        alternation = _ids_to_trie_regex(chunk)
+        terms.append(f'"tag:re:^{prefix_regex}{alternation}{suffix_regex}"')
+    return " OR ".join(terms)
+
+def _escape_like(text):
+    """Escape SQL LIKE wildcards (used with ESCAPE '\\')"""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def resolve_ids_to_note_ids(col, ids, prefix, suffix=""):
+    """
+    Resolve question IDs to note IDs by matching note tags in bulk.
+    
+    Like Anki's tag: search, matching is case-insensitive and a tag also
+    matches its child tags (prefix::ID::anything). Returns {id: [note ids]}
+    for the IDs that matched at least one note.
+    """
+    # Lowercased full tag -> question IDs that produce it
+    wanted = {}
+    for question_id in ids:
+        wanted.setdefault(f"{prefix}{question_id}{suffix}".lower(), []).append(question_id)
+    if not wanted:
+        return {}
+    
+    # One query narrowed by the shared prefix instead of one tag term per ID
+    rows = col.db.all(
+        "select id, tags from notes where tags like ? escape '\\'",
+        f"%{_escape_like(prefix)}%"
+    )
+    
+    matches = {}
+    for note_id, tags in rows:
+        for tag in tags.lower().split():
+            # Check the tag itself and each of its parent tags
+            end = len(tag)
+            while end > 0:
+                for question_id in wanted.get(tag[:end], ()):
+                    note_ids = matches.setdefault(question_id, [])
+                    if not note_ids or note_ids[-1] != note_id:
+                        note_ids.append(note_id)
+                end = tag.rfind("::", 0, end)
+    return matches
+
+# A chunk boundary must follow one of these so that no token spans two chunks
+_SEPARATOR_RE = re.compile(r'[,\s]')
+
+class IdTokenModel:
+    """
+    The question IDs of an editable text, kept current edit by edit.
+    
+    The text is held in chunks of about chunk_size characters, each ending
+    right after a separator, so no token spans two chunks. An edit given as
+    (position, removed, added text) re-scans only the chunks it touches.
+    Each chunk caches its IDs and its part of the OR-joined query, and the
+    ID count is kept as a running total, so neither is rebuilt from scratch.
+    """
+    
+    def __init__(self, bank="UWorld", chunk_size=TOKEN_CHUNK_SIZE):
+        self.bank = bank
+        self.chunk_size = chunk_size
+        self.count = 0
+        self._chunks = []  # [text, ids, query fragment or None]
+        self._length = 0
+        self._tag_pattern = None
+    
+    def __len__(self):
+        """Length of the text in characters"""
+        return self._length
+    
+    def _iter_chunks(self, text):
+        start = 0
+        while start < len(text):
+            match = _SEPARATOR_RE.search(text, start + self.chunk_size - 1)
+            end = match.end() if match else len(text)
+            chunk_text = text[start:end]
+            yield [chunk_text, list(iter_ids(chunk_text, self.bank)), None]
+            start = end
+    
+    def set_text(self, text, should_cancel=None):
+        """
+        Re-scan the whole text. Returns False (leaving the model unchanged)
+        if should_cancel() returned True on the way.
+        """
+        chunks = []
+        for chunk in self._iter_chunks(text):
+            if should_cancel and should_cancel():
+                return False
+            chunks.append(chunk)
+        self._chunks = chunks
+        self._length = len(text)
+        self.count = sum(len(chunk[1]) for chunk in chunks)
+        return True
+    
+    def set_ids(self, ids):
+        """
+        Load IDs that were already extracted for this bank (e.g. a history
+        entry's) as the text "\n".join(ids), without scanning it: each ID
+        is its own token, so the chunks are cut between IDs.
+        """
+        chunks = []
+        batch = []
+        size = 0
+        for question_id in ids:
+            batch.append(question_id)
+            size += len(question_id) + 1
+            if size >= self.chunk_size:
+                chunks.append(["\n".join(batch) + "\n", batch, None])
+                batch = []
+                size = 0
+        if batch:
+            chunks.append(["\n".join(batch), batch, None])
+        elif chunks:
+            chunks[-1][0] = chunks[-1][0][:-1]
+        self._chunks = chunks
+        self._length = sum(len(chunk[0]) for chunk in chunks)
+        self.count = sum(len(chunk[1]) for chunk in chunks)
+    
+    def apply_edit(self, position, removed, added):
+        """
+        Update the model for an edit that replaced removed characters at
+        position with the string added. Raises ValueError if the edit
+        doesn't fit the current text (the caller should call set_text).
+        """
+        if position < 0 or removed < 0 or position + removed > self._length:
+            raise ValueError("edit outside the text")
+        
+        # First chunk touched by the edit (an insertion at a boundary goes
+        # into the chunk that starts there; the previous one ends on a separator)
+        first = 0
+        offset = 0
+        while first < len(self._chunks) - 1 and offset + len(self._chunks[first][0]) <= position:
+            offset += len(self._chunks[first][0])
+            first += 1
+        
+        # Last chunk touched, extended while the new text would end mid-token
+        last = first
+        end = offset
+        while last < len(self._chunks):
+            end += len(self._chunks[last][0])
+            last += 1
+            if end >= position + removed:
+                break
+        old_text = "".join(chunk[0] for chunk in self._chunks[first:last])
+        new_text = old_text[:position - offset] + added + old_text[position + removed - offset:]
+        while last < len(self._chunks) and new_text and not _SEPARATOR_RE.match(new_text[-1]):
+            new_text += self._chunks[last][0]
+            last += 1
+        
+        new_chunks = list(self._iter_chunks(new_text))
+        self.count += sum(len(chunk[1]) for chunk in new_chunks)
+        self.count -= sum(len(chunk[1]) for chunk in self._chunks[first:last])
+        self._chunks[first:last] = new_chunks
+        self._length += len(added) - removed
+    
+    def set_bank(self, bank):
+        """Switch bank; IDs are cleaned per bank, so every chunk is re-scanned"""
+        if bank == self.bank:
+            return
+        self.bank = bank
+        self.set_text(self.text())
+    
+    def text(self):
+        return "".join(chunk[0] for chunk in self._chunks)
+    
+    def ids(self):
+        """All IDs in text order (duplicates kept, like iter_ids)"""
+        return [question_id for chunk in self._chunks for question_id in chunk[1]]
+    
+    def query(self, tag_pattern):
+        """
+        The OR-joined tag query for tag_pattern (same as build_tag_query
+        on ids()), reusing the cached part of every unchanged chunk
+        """
+        if tag_pattern is None:
+            return ""
+        template = compile_tag_pattern(tag_pattern)
+        if tag_pattern != self._tag_pattern:
+            for chunk in self._chunks:
+                chunk[2] = None
+            self._tag_pattern = tag_pattern
+        for chunk in self._chunks:
+            if chunk[2] is None:
+                chunk[2] = template.render_all(chunk[1])
+        return ' OR '.join(chunk[2] for chunk in self._chunks if chunk[2])
+    
+    def convert(self, step_type="Step2", custom_patterns=None, compressed=False, timings=None):
+        """
+        (ids, query) for the current text, like build_tag_query (or
+        build_compressed_tag_query) on ids() without re-scanning the text.
+        The query-building stage is recorded in timings.
+        """
+        start = time.perf_counter()
+        ids = self.ids()
+        if compressed:
+            query = build_compressed_tag_query(ids, step_type, self.bank, custom_patterns)
+        elif self.bank in MIXED_BANKS:
+            # Chunk parts are cached for a single tag pattern only
+            query = build_tag_query(ids, step_type, self.bank, custom_patterns)
+        else:
+            query = self.query(get_tag_pattern(step_type, self.bank, custom_patterns))
+        if timings is not None:
+            timings.record("build_query", time.perf_counter() - start,
+                           ids=len(ids), query_length=len(query))
+        return ids, query
+
+class ConversionCache:
+    """
+    LRU cache of finished conversions, (ids, query), so switching bank or
+    step back and forth or reopening the dialog on the same input doesn't
+    parse and build again.
+    
+    Entries are keyed by a digest of the input text plus everything the
+    result depends on, and evicted least recently used first once their
+    approximate total size exceeds max_bytes. A single result larger than
+    max_bytes is not cached at all.
+    """
+    
+    # Rough per-ID cost of a short str plus its list slot
+    _ID_OVERHEAD = 57
+    
+    def __init__(self, max_bytes=CONVERSION_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()  # key -> (result, size)
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    @staticmethod
+    def key(text, bank, step_type, tag_pattern, compressed=False):
+        """
+        Cache key for a conversion. tag_pattern is the resolved pattern
+        (get_tag_pattern), which stands in for the custom_patterns version.
+        """
+        digest = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        return (digest, len(text), bank, step_type, tag_pattern, bool(compressed))
+    
+    def get(self, key):
+        """The cached (ids, query) for key, or None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+    
+    def put(self, key, result):
+        ids, query = result
+        size = len(query) + sum(map(len, ids)) + self._ID_OVERHEAD * len(ids)
+        if size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= old[1]
+        self._entries[key] = (result, size)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.size -= evicted_size
+    
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+def find_cards_in_chunks(col, ids, step_type="Step2", bank="UWorld", custom_patterns=None,
+                         compressed=False, chunk_size=SEARCH_CHUNK_SIZE,
+                         on_progress=None, should_cancel=None):
+    """
+    Search for a large ID list in bounded chunks and merge the matched cards.
+    
+    A single query with thousands of terms can exceed Anki's search parser
+    and SQLite expression limits; each chunk's query stays small.
+    on_progress(done, total) is called after every chunk and should_cancel()
+    is checked before each one. Returns (sorted card ids, cancelled).
+    """
+    build_query = build_compressed_tag_query if compressed else build_tag_query
+    card_ids = set()
+    total = len(ids)
+    for start in range(0, total, chunk_size):
+        if should_cancel and should_cancel():
+            return sorted(card_ids), True
+        query = build_query(ids[start:start + chunk_size], step_type, bank, custom_patterns)
+        if query:
+            card_ids.update(col.find_cards(query))
+        if on_progress:
+            on_progress(min(start + chunk_size, total), total)
+    return sorted(card_ids), False
+
+def count_cards_of_notes(col, note_ids, batch_size=EXTRACT_BATCH_SIZE):
+    """Number of cards belonging to the given notes (bulk SQL, batched)"""
+    total = 0
+    for start in range(0, len(note_ids), batch_size):
+        batch = note_ids[start:start + batch_size]
+        total += col.db.scalar(
+            f"select count() from cards where nid in ({','.join(str(int(nid)) for nid in batch)})"
+        )
+    return total
+
+def iter_note_tags_for_cards(col, card_ids, batch_size=EXTRACT_BATCH_SIZE, on_progress=None):
+    """
+    Yield the tag string of each distinct note behind the given cards, in
+    selection order, fetching the tags with one query per batch of cards.
+    on_progress(done, total) is called after every batch.
+    """
+    seen_notes = set()
+    total = len(card_ids)
+    for start in range(0, total, batch_size):
+        batch = card_ids[start:start + batch_size]
+        rows = col.db.all(
+            "select c.id, n.id, n.tags from cards c join notes n on n.id = c.nid "
+            f"where c.id in ({','.join(str(int(card_id)) for card_id in batch)})"
+        )
+        note_by_card = {card_id: (note_id, tags) for card_id, note_id, tags in rows}
+        for card_id in batch:
+            if card_id not in note_by_card:
+                continue
+            note_id, tags = note_by_card[card_id]
+            if note_id not in seen_notes:
+                seen_notes.add(note_id)
+                yield tags
+        if on_progress:
+            on_progress(min(start + batch_size, total), total)
+
+# AnKing tag paths carrying question IDs, in priority order:
+#   #AK_Step[123]_v##::#UWorld::Step::12345
+#   #AK_Step3_v##::#UWorld::98765
+#   #AK_Step[12]_v##::#AMBOSS::-aaDMQ
+#   #AK_Step[12]_v##::#UWorld::COMLEX::106228
+_QUESTION_TAG_PATTERNS = [
+    r'#AK_Step(?P<uworld_step>[123])_v\d+::#UWorld::Step::(?P<uworld>\d+)',
+    r'#AK_Step3_v\d+::#UWorld::(?P<uworld3>\d+)',
+    r'#AK_Step(?P<amboss_step>[12])_v\d+::#AMBOSS::(?P<amboss>[a-zA-Z0-9\-_]+)',
+    r'#AK_Step(?P<comlex_step>[12])_v\d+::#UWorld::COMLEX::(?P<comlex>\d+)'
+]
+
+# One alternation classifies a tag in a single match; the name of the ID
+# group that matched tells the bank
+QUESTION_TAG_RE = re.compile("|".join(_QUESTION_TAG_PATTERNS))
+_QUESTION_TAG_RES = [re.compile(pattern) for pattern in _QUESTION_TAG_PATTERNS]
+_TAG_PATH_START = "#AK_Step"
+
+# ID group name -> (bank, name of the group holding the step digit)
+_QUESTION_TAG_GROUPS = {
+    "uworld": ("UWorld", "uworld_step"),
+    "uworld3": ("UWorld", None),  # always Step 3
+    "amboss": ("AMBOSS", "amboss_step"),
+    "comlex": ("COMLEX", "comlex_step")
+}
+
+def parse_question_tag(tag):
+    """
+    Classify an AnKing tag. Returns (bank, step, question_id), e.g.
+    ("UWorld", "Step2", "12345"), or None if the tag holds no question ID.
+    """
+    match = QUESTION_TAG_RE.search(tag)
+    if match is None:
+        return None
+    
+    # The alternation picks the leftmost path; if a tag holds several AnKing
+    # paths, a later one may belong to a higher-priority pattern
+    if match.lastgroup != "uworld" and tag.find(_TAG_PATH_START, match.start() + 1) != -1:
+        for regex in _QUESTION_TAG_RES:
+            match = regex.search(tag)
+            if match:
+                break
+    
+    bank, step_group = _QUESTION_TAG_GROUPS[match.lastgroup]
+    step = match.group(step_group) if step_group else "3"
+    return bank, f"Step{step}", match.group(match.lastgroup)
+
+def parse_question_ids_from_tags(tag_strings):
+    """
+    Extract UWorld/AMBOSS/COMLEX question IDs from note tag strings
+    (space-separated, as stored in the notes table). Each distinct tag is
+    parsed once; IDs keep first-seen order per bank.
+    """
+    # Dicts as insertion-ordered sets: O(1) dedup, first-seen order
+    extracted_ids = {
+        "UWorld": {},
+        "AMBOSS": {},
+        "COMLEX": {}
+    }
+    seen_tags = set()
+    
+    for tag_string in tag_strings:
+        for tag in tag_string.split():
+            if tag in seen_tags:
+                continue
+            seen_tags.add(tag)
+            
+            parsed = parse_question_tag(tag)
+            if parsed is not None:
+                bank, _, question_id = parsed
+                extracted_ids[bank][question_id] = None
+    
+    return {bank: list(ids) for bank, ids in extracted_ids.items()}
+
+def coverage_summary(ids, matches):
+    """
+    Split IDs into found and missing (unique, input order) given the
+    {id: [note ids]} matches from a lookup. Returns a dict with "found",
+    "missing" and the sorted, distinct matched "note_ids".
+    """
+    unique_ids = list(dict.fromkeys(ids))
+    return {
+        "found": [question_id for question_id in unique_ids if question_id in matches],
+        "missing": [question_id for question_id in unique_ids if question_id not in matches],
+        "note_ids": sorted({note_id for note_ids in matches.values() for note_id in note_ids})
+    }
+
+# Tag prefixes of the default patterns (lowercased), the ones QuestionIndex indexes
+QUESTION_INDEX_PREFIXES = frozenset(
+    split[0].lower()
+    for split in (
+        split_tag_pattern(get_tag_pattern(step, bank))
+        for bank in ("UWorld", "AMBOSS", "COMLEX")
+        for step in ("Step1", "Step2", "Step3")
+    )
+    if split is not None and not split[1]
+)
+_INDEX_TAG_START = "#ak_step"
+# Every note QuestionIndex may index; LIKE is case-insensitive for ASCII
+_INDEX_NOTES_SQL = "select id, tags from notes where tags like '%#AK\\_Step%' escape '\\'"
+
+class QuestionIndex:
+    """
+    Reverse index from (tag prefix, question ID) to note IDs, for the
+    prefixes of the default patterns (QUESTION_INDEX_PREFIXES).
+    
+    It answers exactly what resolve_ids_to_note_ids answers for a
+    "tag:<prefix>{ID}" pattern: a note matches if one of its tags, or a
+    parent of it, is the prefix followed by the ID, compared from the start
+    of the tag and case-insensitively. Notes are added or refreshed from
+    (note_id, tags) rows. To keep it current, sync_notes diffs it against
+    read_question_index_notes: note mtimes can't be trusted for that, as
+    undo restores old ones and imported notes keep their source's.
+    """
+    
+    def __init__(self, prefixes=QUESTION_INDEX_PREFIXES):
+        self.prefixes = frozenset(prefix.lower() for prefix in prefixes)
+        self._notes_by_key = {}  # (prefix, id) -> set of note ids
+        self._keys_by_note = {}  # note id -> keys it is indexed under
+        self._tag_cache = {}  # tag -> keys of the tag; tags repeat a lot
+    
+    def __len__(self):
+        """Number of indexed notes"""
+        return len(self._keys_by_note)
+    
+    def covers(self, prefix, suffix=""):
+        """Whether lookups for a split_tag_pattern (prefix, suffix) can use the index"""
+        return not suffix and prefix.lower() in self.prefixes
+    
+    def _keys_for_tag(self, tag):
+        keys = []
+        tag = tag.lower()
+        if not tag.startswith(_INDEX_TAG_START):
+            return keys
+        # The tag and each parent tag, split into prefix and last segment
+        end = len(tag)
+        while end > 0:
+            split = tag.rfind("::", 0, end)
+            if split == -1:
+                break
+            prefix = tag[:split + 2]
+            if prefix in self.prefixes and end > split + 2:
+                keys.append((prefix, tag[split + 2:end]))
+            end = split
+        return keys
+    
+    def _keys_for_tags(self, tags):
+        keys = set()
+        for tag in tags.split():
+            tag_keys = self._tag_cache.get(tag)
+            if tag_keys is None:
+                tag_keys = self._tag_cache[tag] = self._keys_for_tag(tag)
+            keys.update(tag_keys)
+        return keys
+    
+    def _set_keys(self, note_id, keys):
+        self.remove_notes((note_id,))
+        if keys:
+            self._keys_by_note[note_id] = keys
+            for key in keys:
+                self._notes_by_key.setdefault(key, set()).add(note_id)
+    
+    def update_notes(self, rows):
+        """Add or refresh notes from (note_id, tags) rows"""
+        for note_id, tags in rows:
+            self._set_keys(note_id, self._keys_for_tags(tags))
+    
+    def sync_notes(self, rows):
+        """
+        Bring the index in line with the (note_id, tags) rows of every note
+        it may index (read_question_index_notes): notes whose keys changed are
+        re-indexed, indexed notes missing from rows are dropped. Returns the
+        number of notes changed.
+        """
+        seen = set()
+        changed = 0
+        for note_id, tags in rows:
+            seen.add(note_id)
+            keys = self._keys_for_tags(tags)
+            if keys != self._keys_by_note.get(note_id, set()):
+                self._set_keys(note_id, keys)
+                changed += 1
+        stale = [note_id for note_id in self._keys_by_note if note_id not in seen]
+        self.remove_notes(stale)
+        return changed + len(stale)
+    
+    def remove_notes(self, note_ids):
+        """Drop deleted (or re-tagged) notes from the index"""
+        for note_id in note_ids:
+            for key in self._keys_by_note.pop(note_id, ()):
+                note_set = self._notes_by_key[key]
+                note_set.discard(note_id)
+                if not note_set:
+                    del self._notes_by_key[key]
+    
+    def note_ids(self, prefix, question_id):
+        """Note IDs tagged with one question ID (empty set if none)"""
+        return self._notes_by_key.get((prefix.lower(), question_id.lower()), set())
+    
+    def lookup(self, prefix, ids):
+        """
+        Resolve many IDs at once: {id: [note ids]} for the IDs that matched,
+        like resolve_ids_to_note_ids(col, ids, prefix)
+        """
+        prefix = prefix.lower()
+        matches = {}
+        for question_id in ids:
+            note_set = self._notes_by_key.get((prefix, question_id.lower()))
+            if note_set:
+                matches[question_id] = sorted(note_set)
+        return matches
+    
+    def count(self, prefix):
+        """Number of distinct question IDs indexed under a tag prefix"""
+        prefix = prefix.lower()
+        return sum(1 for key_prefix, _ in self._notes_by_key if key_prefix == prefix)
+
+def read_question_index_notes(col):
+    """(note_id, tags) of every note with an AnKing Step tag, for QuestionIndex.sync_notes"""
+    return col.db.all(_INDEX_NOTES_SQL)
+
+class TimingLog:
+    """
+    Bounded in-memory log of how long each stage of a conversion or search
+    took, for the diagnostics view. Recording does nothing while disabled;
+    appends are safe from worker threads.
+    """
+    
+    def __init__(self, size=TIMING_LOG_SIZE, enabled=False):
+        self.enabled = enabled
+        self._entries = deque(maxlen=size)
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def record(self, stage, seconds, **details):
+        """Add one timing; details are extra counts such as ids or query_length"""
+        if self.enabled:
+            self._entries.append({
+                "time": time.time(),
+                "stage": stage,
+                "ms": round(seconds * 1000, 3),
+                **details
+            })
+    
+    @contextmanager
+    def measure(self, stage, **details):
+        """
+        Time the with-block as one stage. The block may add details to the
+        yielded dict, e.g. once the query length is known.
+        """
+        start = time.perf_counter()
+        try:
+            yield details
+        finally:
+            self.record(stage, time.perf_counter() - start, **details)
+    
+    def entries(self):
+        """Recorded timings, oldest first"""
+        return list(self._entries)
+    
+    def clear(self):
+        self._entries.clear()
+    
+    def to_json(self):
+        """Recorded timings as a JSON document for bug reports"""
+        return json.dumps({"entries": self.entries()}, indent=2)
+
+def make_history_entry(ids, step_type, bank):
+    """History entry for a conversion: the deduplicated IDs plus a short preview"""
+    unique_ids = list(dict.fromkeys(ids))
+    preview = ", ".join(islice(unique_ids, HISTORY_PREVIEW_CHARS))
+    if len(preview) > HISTORY_PREVIEW_CHARS:
+        preview = preview[:HISTORY_PREVIEW_CHARS] + "..."
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "bank": bank,
+        "step": step_type,
+        "count": len(unique_ids),
+        "ids_preview": preview,
+        "ids": unique_ids
+    }
+
+class HistoryStore:
+    """
+    Append-only conversion history, one JSON entry per line.
+    
+    Appending writes one line and never rewrites the file. Line offsets are
+    indexed on first read, so pages of the newest entries are read by seeking
+    rather than by loading the whole log. Once the log holds twice
+    max_entries, or more than max_bytes, it is compacted down to the newest
+    max_entries entries that fit in half of max_bytes (the newest entry is
+    always kept). Lines that don't parse (e.g. a write cut short by a crash)
+    are skipped.
+    """
+    
+    def __init__(self, path, max_entries=HISTORY_MAX_ENTRIES, max_bytes=HISTORY_MAX_BYTES):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._offsets = None  # start of each line, then the end of the file
+    
+    def __len__(self):
+        return len(self._line_offsets()) - 1
+    
+    def _line_offsets(self):
+        if self._offsets is not None:
+            return self._offsets
+        offsets = array("q", [0])
+        torn = False
+        try:
+            with open(self.path, "rb") as f:
+                position = 0
+                while True:
+                    chunk = f.read(FILE_READ_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    start = chunk.find(b"\n")
+                    while start != -1:
+                        offsets.append(position + start + 1)
+                        start = chunk.find(b"\n", start + 1)
+                    position += len(chunk)
+                # A last line without its newline is a torn write: drop it
+                torn = position != offsets[-1]
+        except FileNotFoundError:
+            pass
+        if torn:
+            with open(self.path, "r+b") as f:
+                f.truncate(offsets[-1])
+        self._offsets = offsets
+        return offsets
+    
+    def append(self, entry):
+        """Add one entry at the end of the log"""
+        offsets = self._line_offsets()
+        line = (json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "ab") as f:
+            f.write(line)
+        offsets.append(offsets[-1] + len(line))
+        if len(offsets) - 1 > 2 * self.max_entries or offsets[-1] > self.max_bytes:
+            self.compact()
+    
+    def extend(self, entries):
+        """Append several entries, oldest first"""
+        for entry in entries:
+            self.append(entry)
+    
+    def page(self, start=0, count=100):
+        """Up to count entries, newest first, skipping the start newest"""
+        offsets = self._line_offsets()
+        last = len(offsets) - 1 - start
+        first = max(last - count, 0)
+        if last <= 0:
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(offsets[first])
+            lines = f.read(offsets[last] - offsets[first]).splitlines()
+        entries = []
+        for line in reversed(lines):
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+        return entries
+    
+    def compact(self):
+        """Rewrite the log with only the newest max_entries that fit half of max_bytes"""
+        offsets = self._line_offsets()
+        last = len(offsets) - 1
+        first = max(last - self.max_entries, 0)
+        # Half the byte bound, so the next compaction is many appends away
+        while first < last - 1 and offsets[last] - offsets[first] > self.max_bytes // 2:
+            first += 1
+        temp_path = self.path + ".tmp"
+        with open(self.path, "rb") as source, open(temp_path, "wb") as target:
+            source.seek(offsets[first])
+            remaining = offsets[last] - offsets[first]
+            while remaining:
+                chunk = source.read(min(FILE_READ_CHUNK_SIZE, remaining))
+                target.write(chunk)
+                remaining -= len(chunk)
+        os.replace(temp_path, self.path)
+        base = offsets[first]
+        self._offsets = array("q", (offset - base for offset in offsets[first:]))
+    
+    def clear(self):
+        """Delete every entry"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        self._offsets = array("q", [0])
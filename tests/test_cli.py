@@ -0,0 +1,48 @@
+# cli.py reads files the way the add-on's file import does
+#
+# Run: python -m pytest -q   (or python -m unittest discover tests)
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cli
+import core
+
+class CliInputTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.folder = directory.name
+
+    def write(self, name, content):
+        path = os.path.join(self.folder, name)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def test_csv_files_match_the_add_on(self):
+        paths = [
+            self.write("semicolon.csv", "101;5\n102;3\n"),
+            self.write("pipe.tsv", "QuestionID|Score\n201|5\n"),
+            self.write("plain.txt", "301, 302\n")
+        ]
+        expected = [question_id for path in paths for question_id in core.read_ids_from_file(path)]
+        self.assertEqual(expected, ["101", "5", "102", "3", "201", "5", "301", "302"])
+        self.assertEqual(list(cli.iter_input_ids(paths, "UWorld")), expected)
+        self.assertEqual(list(cli.iter_input_ids(paths, "UWorld", jobs=2)), expected)
+
+    def test_csv_options_override_detection(self):
+        path = self.write("export.csv", "QuestionID;Score\nabC1;5\n-xyZ;3\n")
+
+        def ids(*options):
+            return list(cli.iter_input_ids([path], "AMBOSS", options, True))
+        self.assertEqual(ids(0, None, None), ["abC1", "-xyZ"])
+        self.assertEqual(ids(0, ";", None), ["abC1", "-xyZ"])
+        self.assertEqual(ids(0, None, False), ["QuestionID", "abC1", "-xyZ"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,273 @@
+# Qt-free hot paths checked against reference behaviour: ID extraction and
+# the clipboard heuristic against the 1.4.1 algorithms they replaced, the
+# incremental token model against a full re-parse, and compact tag:re:
+# queries against the tag: searches they stand in for.
+#
+# Run: python -m pytest -q   (or python -m unittest discover tests)
+
+import io
+import os
+import random
+import re
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import core
+
+BANKS = ["UWorld", "AMBOSS", "COMLEX"]
+# Separators, ID characters, noise and a few non-ASCII digits/spaces
+ALPHABET = "0123456789" * 3 + "abcXYZ-_" + " ,\t\n\r" * 2 + "#.:()Q@" + "\u0663\u00a0\u2029\u00e9"
+
+def reference_clean_and_extract_ids(text, bank="UWorld"):
+    """clean_and_extract_ids as shipped in 1.4.1"""
+    text = re.sub(r'[,\s\t\n]+', ',', text)
+    ids = []
+    for item in text.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        if bank == "AMBOSS":
+            clean_id = re.sub(r'[^a-zA-Z0-9\-_]', '', item)
+            if clean_id and re.search(r'[a-zA-Z]', clean_id):
+                ids.append(clean_id)
+        else:
+            clean_id = re.sub(r'\D', '', item)
+            if clean_id:
+                ids.append(clean_id)
+    return ids
+
+def reference_looks_like_question_ids(clipboard_text):
+    """The 1.4.1 clipboard auto-load decision (inlined in the dialog then)"""
+    clipboard_text = clipboard_text.strip()
+    if not clipboard_text:
+        return False
+    skip_markers = [
+        '<b>', '<i>', '<a>', 'http', 'www.', '@', 'README', 'NEW in',
+        'What It Does', 'Features:', 'Requirements:', 'I am', 'I will',
+        'the ', 'and ', 'for ', 'with ', 'that ', 'this ', 'have ',
+        'Step 1', 'Step 2', 'Step 3', 'question bank'
+    ]
+    should_skip = any(marker in clipboard_text.lower() for marker in [m.lower() for m in skip_markers])
+    digits_and_spaces = sum(c.isdigit() or c.isspace() or c in ',-_' for c in clipboard_text)
+    mostly_numbers = (digits_and_spaces / len(clipboard_text)) > 0.85
+    if not mostly_numbers:
+        if clipboard_text.count(' ') / len(clipboard_text) > 0.15:
+            should_skip = True
+        lines = clipboard_text.split('\n')
+        if sum(len(line) for line in lines) / len(lines) > 100:
+            should_skip = True
+    if should_skip:
+        return False
+    parts = re.split(r'[,\s\n\t]+', clipboard_text)
+    id_like_parts = 0
+    total_parts = 0
+    for part in parts[:100]:
+        part = part.strip()
+        if not part:
+            continue
+        total_parts += 1
+        if re.match(r'^\d+$', part):
+            if len(part) <= 10:
+                id_like_parts += 1
+        elif re.match(r'^[\-_][a-zA-Z0-9]{3,}$', part) or re.match(r'^[a-zA-Z0-9]{2,}[\-_][a-zA-Z0-9]+$', part):
+            if len(part) <= 10:
+                id_like_parts += 1
+    return (0 < total_parts <= 200 and id_like_parts / total_parts > 0.8
+            and len(clipboard_text) < 2000)
+
+def random_text(rng, max_length=60, alphabet=ALPHABET):
+    return "".join(rng.choice(alphabet) for _ in range(rng.randint(0, max_length)))
+
+def random_id(rng, bank):
+    if bank == "AMBOSS":
+        return "".join(rng.choice("abcXYZ019-_") for _ in range(rng.randint(1, 6))) + rng.choice("aZ")
+    return str(rng.randint(1, 99999))
+
+class ExtractionTest(unittest.TestCase):
+    def test_matches_1_4_1_on_random_text(self):
+        rng = random.Random(17)
+        for _ in range(3000):
+            text = random_text(rng)
+            for bank in BANKS:
+                self.assertEqual(core.clean_and_extract_ids(text, bank),
+                                 reference_clean_and_extract_ids(text, bank), (text, bank))
+
+    def test_stream_reader_matches_whole_text(self):
+        rng = random.Random(18)
+        for _ in range(300):
+            text = random_text(rng, 400)
+            for bank in BANKS:
+                stream = io.StringIO(text)
+                self.assertEqual(list(core.iter_ids_from_stream(stream, bank, chunk_size=7)),
+                                 core.clean_and_extract_ids(text, bank))
+
+    def test_mixed_bank_takes_each_tokens_own_rule(self):
+        rng = random.Random(22)
+        for _ in range(2000):
+            text = random_text(rng, 30)
+            for token in core._TOKEN_RE.findall(text):
+                amboss = core.clean_and_extract_ids(token, "AMBOSS")
+                numeric = core.clean_and_extract_ids(token, "UWorld")
+                self.assertEqual(core.clean_and_extract_ids(token, "UWorld+AMBOSS"), amboss or numeric)
+
+class ClipboardTest(unittest.TestCase):
+    def test_matches_1_4_1_on_random_text(self):
+        rng = random.Random(19)
+        alphabets = [ALPHABET, "0123456789 ,\n", "0123456789abc-_ \n", "abcdefgh the and ,.\n0123"]
+        for _ in range(20000):
+            text = random_text(rng, rng.choice([5, 40, 300]), rng.choice(alphabets))
+            self.assertEqual(core.looks_like_question_ids(text),
+                             reference_looks_like_question_ids(text), repr(text))
+
+    def test_matches_1_4_1_on_id_lists_and_prose(self):
+        rng = random.Random(20)
+        samples = [
+            "", "   ", ",", "12345", "12345, 67890\n24680", "-aaDMQ, 0jae_4, 3_0SLi",
+            "Step 1 notes 123", "see https://example.com 123", "12345678901 2",
+            ", ".join(str(n) for n in range(150)), "1 " * 999, "1 " * 1001,
+            "What It Does - converts question IDs " * 3
+        ]
+        for bank in BANKS:
+            for count in (5, 50, 250):
+                samples.append(", ".join(random_id(rng, bank) for _ in range(count)))
+        for text in samples:
+            self.assertEqual(core.looks_like_question_ids(text),
+                             reference_looks_like_question_ids(text), repr(text[:80]))
+
+class IdTokenModelTest(unittest.TestCase):
+    def check(self, model, text, bank):
+        self.assertEqual(model.text(), text)
+        self.assertEqual(len(model), len(text))
+        ids = list(core.iter_ids(text, bank))
+        self.assertEqual(model.ids(), ids)
+        self.assertEqual(model.count, len(ids))
+        for step_type in ("Step1", "Step2"):
+            if bank in core.MIXED_BANKS:
+                self.assertEqual(model.convert(step_type), (ids, core.build_tag_query(ids, step_type, bank)))
+                continue
+            tag_pattern = core.get_tag_pattern(step_type, bank)
+            self.assertEqual(model.query(tag_pattern), core.build_tag_query(ids, step_type, bank))
+
+    def test_random_edits_match_a_full_parse(self):
+        rng = random.Random(21)
+        for bank in BANKS:
+            for _ in range(40):
+                model = core.IdTokenModel(bank, chunk_size=rng.choice([4, 16, 64]))
+                text = random_text(rng, 200)
+                model.set_text(text)
+                self.check(model, text, bank)
+                for _ in range(30):
+                    position = rng.randint(0, len(text))
+                    removed = rng.randint(0, min(len(text) - position, 20))
+                    added = random_text(rng, 20)
+                    model.apply_edit(position, removed, added)
+                    text = text[:position] + added + text[position + removed:]
+                    self.check(model, text, bank)
+
+    def test_set_ids_matches_a_full_parse(self):
+        rng = random.Random(25)
+        for bank in BANKS + list(core.MIXED_BANKS):
+            for count in (0, 1, 7, 200):
+                ids = list(dict.fromkeys(random_id(rng, rng.choice(core.bank_components(bank)))
+                                         for _ in range(count)))
+                model = core.IdTokenModel(bank, chunk_size=rng.choice([4, 16, 64]))
+                model.set_ids(ids)
+                text = "\n".join(ids)
+                self.check(model, text, bank)
+                model.apply_edit(len(text) // 2, 0, ", 12 ")
+                text = text[:len(text) // 2] + ", 12 " + text[len(text) // 2:]
+                self.check(model, text, bank)
+
+    def test_edit_outside_the_text_is_rejected(self):
+        model = core.IdTokenModel()
+        model.set_text("123 456")
+        with self.assertRaises(ValueError):
+            model.apply_edit(5, 5, "")
+
+    def test_convert_matches_the_query_builders(self):
+        rng = random.Random(23)
+        text = ", ".join(random_id(rng, bank) for bank in rng.choices(BANKS, k=300))
+        for bank in BANKS + list(core.MIXED_BANKS):
+            model = core.IdTokenModel(bank, chunk_size=32)
+            model.set_text(text)
+            ids = list(core.iter_ids(text, bank))
+            for compressed in (False, True):
+                build_query = core.build_compressed_tag_query if compressed else core.build_tag_query
+                self.assertEqual(model.convert("Step2", compressed=compressed),
+                                 (ids, build_query(ids, "Step2", bank)))
+
+class ImportTest(unittest.TestCase):
+    def test_column_choice_applies_across_delimiters(self):
+        with tempfile.TemporaryDirectory() as folder:
+            files = {
+                "a.csv": "QuestionID,Score\n101,5\n102,3\n",
+                "b.tsv": "QuestionID\tScore\n201\t5\n202\t3\n",
+                "c.txt": "301 302\n",
+                "d.csv": "Score\n"
+            }
+            for name, content in files.items():
+                with open(os.path.join(folder, name), "w") as f:
+                    f.write(content)
+            ids_by_bank, file_results, cancelled = core.import_id_files(
+                core.expand_import_paths([folder]), "UWorld", (0, None, True)
+            )
+        self.assertFalse(cancelled)
+        self.assertEqual(ids_by_bank, {"UWorld": ["101", "102", "201", "202", "301", "302"]})
+        self.assertEqual([result["count"] for result in file_results], [2, 2, 2, 0])
+
+def compressed_regexes(query):
+    """The regexes of a query's "tag:re:..." terms"""
+    terms = query.split(" OR ")
+    for term in terms:
+        assert term.startswith('"tag:re:') and term.endswith('"'), term
+    return [re.compile(term[len('"tag:re:'):-1], re.IGNORECASE) for term in terms]
+
+class CompressedQueryTest(unittest.TestCase):
+    def assert_same_tags(self, ids, tag_pattern, tags):
+        """The compact query matches exactly the tags (or child tags) of prefix + ID + suffix"""
+        custom_patterns = {"UWorld_Step2": tag_pattern}
+        regexes = compressed_regexes(core.build_compressed_tag_query(ids, "Step2", "UWorld", custom_patterns))
+        prefix, suffix = core.split_tag_pattern(tag_pattern)
+        wanted = {f"{prefix}{question_id}{suffix}".lower() for question_id in ids}
+        for tag in tags:
+            lowered = tag.lower()
+            expected = lowered in wanted or any(lowered.startswith(full + "::") for full in wanted)
+            self.assertEqual(any(regex.search(tag) for regex in regexes), expected, (tag, ids))
+
+    def candidate_tags(self, rng, prefix, suffix, ids):
+        tags = []
+        for question_id in ids + [random_id(rng, "AMBOSS") for _ in range(20)]:
+            full = f"{prefix}{question_id}{suffix}"
+            tags += [
+                full, full.upper(), full + "::child", full + "x", full + ":x",
+                f"{prefix}{question_id[:-1]}{suffix}", f"{prefix}{question_id}5{suffix}",
+                "Foo::" + full, f"{prefix}x{question_id}{suffix}"
+            ]
+        return tags
+
+    def test_exact_ids_and_child_tags(self):
+        rng = random.Random(24)
+        patterns = [
+            "tag:#AK_Step2_v12::#UWorld::Step::{ID}",
+            "tag:#Deck::{ID}::Q",
+            "tag:#Deck.v1+[x]^$|?::{ID}"
+        ]
+        for tag_pattern in patterns:
+            prefix, suffix = core.split_tag_pattern(tag_pattern)
+            for _ in range(30):
+                bank = rng.choice(["UWorld", "AMBOSS"])
+                ids = [random_id(rng, bank) for _ in range(rng.randint(1, 40))]
+                self.assert_same_tags(ids, tag_pattern, self.candidate_tags(rng, prefix, suffix, ids))
+
+    def test_large_id_sets_are_split_into_terms(self):
+        ids = [str(n) for n in range(1, core.COMPRESSED_TERM_MAX_IDS * 2 + 500)]
+        query = core.build_compressed_tag_query(ids, "Step2", "UWorld")
+        self.assertEqual(len(compressed_regexes(query)), 3)
+        tags = [f"#AK_Step2_v12::#UWorld::Step::{n}" for n in (1, 2500, 4499, 4500, 0, 10000)]
+        self.assert_same_tags(ids, core.get_tag_pattern("Step2", "UWorld"), tags)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+# HistoryStore: append-only log, paging, retention and crash recovery
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import core
+
+class HistoryStoreTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "user_files", "history.jsonl")
+
+    def numbers(self, store, start=0, count=1000):
+        return [entry["n"] for entry in store.page(start, count)]
+
+    def test_pages_newest_first(self):
+        store = core.HistoryStore(self.path)
+        store.extend({"n": n} for n in range(25))
+        self.assertEqual(len(store), 25)
+        self.assertEqual(self.numbers(store, 0, 3), [24, 23, 22])
+        self.assertEqual(self.numbers(store, 23, 10), [1, 0])
+        self.assertEqual(store.page(25, 10), [])
+        # A fresh store reads the same log back
+        self.assertEqual(self.numbers(core.HistoryStore(self.path)), list(range(24, -1, -1)))
+
+    def test_compaction_keeps_max_entries(self):
+        store = core.HistoryStore(self.path, max_entries=10)
+        store.extend({"n": n} for n in range(20))
+        self.assertEqual(len(store), 20)
+        store.append({"n": 20})
+        self.assertEqual(self.numbers(store), list(range(20, 10, -1)))
+        self.assertEqual(self.numbers(core.HistoryStore(self.path)), list(range(20, 10, -1)))
+
+    def test_byte_bound_keeps_the_newest_entry(self):
+        store = core.HistoryStore(self.path, max_entries=100, max_bytes=200)
+        store.extend({"n": n} for n in range(5))
+        store.append({"n": 5, "ids": ["1"] * 100})
+        self.assertEqual(self.numbers(store), [5])
+        store.extend({"n": n} for n in range(6, 40))
+        self.assertLessEqual(os.path.getsize(self.path), 200)
+        self.assertEqual(self.numbers(store)[0], 39)
+
+    def test_torn_last_line_is_dropped(self):
+        store = core.HistoryStore(self.path)
+        store.extend({"n": n} for n in range(3))
+        with open(self.path, "ab") as f:
+            f.write(b'{"n": 3, "ids": ["12')
+        store = core.HistoryStore(self.path)
+        self.assertEqual(len(store), 3)
+        store.append({"n": 4})
+        self.assertEqual(self.numbers(core.HistoryStore(self.path)), [4, 2, 1, 0])
+
+    def test_unparseable_lines_are_skipped(self):
+        store = core.HistoryStore(self.path)
+        store.append({"n": 0})
+        with open(self.path, "ab") as f:
+            f.write(b"not json\n")
+        store = core.HistoryStore(self.path)
+        store.append({"n": 1})
+        self.assertEqual(self.numbers(store), [1, 0])
+
+    def test_clear(self):
+        store = core.HistoryStore(self.path)
+        store.extend({"n": n} for n in range(3))
+        store.clear()
+        self.assertEqual(len(store), 0)
+        self.assertEqual(store.page(), [])
+        store.append({"n": 7})
+        self.assertEqual(self.numbers(core.HistoryStore(self.path)), [7])
+
+    def test_entry_keeps_unique_ids_in_order(self):
+        entry = core.make_history_entry(["3", "1", "3", "abC1", "1"], "Step2", "UWorld+AMBOSS")
+        self.assertEqual(entry["ids"], ["3", "1", "abC1"])
+        self.assertEqual(entry["count"], 3)
+        self.assertEqual(entry["bank"], "UWorld+AMBOSS")
+
+if __name__ == "__main__":
+    unittest.main()
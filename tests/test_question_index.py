@@ -0,0 +1,114 @@
+# QuestionIndex must answer exactly what resolve_ids_to_note_ids answers for
+# the same tag prefix, whether or not the background index build finished.
+#
+# Run: python -m unittest discover tests   (or python -m pytest tests)
+
+import os
+import random
+import sqlite3
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import core
+
+class NotesCollection:
+    """Just enough of a collection for resolve_ids_to_note_ids: col.db.all"""
+    def __init__(self, rows):
+        self.db = self
+        self._conn = sqlite3.connect(":memory:")
+        self._conn.execute("create table notes (id integer primary key, tags text, mod integer)")
+        self._conn.executemany("insert into notes values (?, ?, 100)", rows)
+    
+    def set_note(self, note_id, tags, mod):
+        self._conn.execute("insert or replace into notes values (?, ?, ?)", (note_id, tags, mod))
+
+    def all(self, sql, *args):
+        return self._conn.execute(sql, args).fetchall()
+
+def default_prefix(step_type, bank):
+    prefix, suffix = core.split_tag_pattern(core.get_tag_pattern(step_type, bank))
+    return prefix
+
+class QuestionIndexTest(unittest.TestCase):
+    def assert_agrees(self, rows, prefix, ids):
+        index = core.QuestionIndex()
+        index.update_notes(rows)
+        expected = core.resolve_ids_to_note_ids(NotesCollection(rows), ids, prefix)
+        self.assertEqual(index.lookup(prefix, ids), expected)
+
+    def test_only_the_pattern_version_and_tag_start_match(self):
+        rows = [
+            (1, " #AK_Step2_v11::#UWorld::Step::100 "),
+            (2, " #AK_Step2_v12::#UWorld::Step::200 "),
+            (3, " Foo::#AK_Step2_v12::#UWorld::Step::300 "),
+            (4, " #AK_Step3_v12::#UWorld::Step::400 ")
+        ]
+        prefix = default_prefix("Step2", "UWorld")
+        self.assert_agrees(rows, prefix, ["100", "200", "300", "400"])
+        index = core.QuestionIndex()
+        index.update_notes(rows)
+        self.assertEqual(index.lookup(prefix, ["100", "200", "300"]), {"200": [2]})
+        self.assertEqual(index.lookup(default_prefix("Step3", "UWorld"), ["400"]), {})
+
+    def test_child_tags_and_case_match(self):
+        rows = [
+            (1, " #AK_Step1_v12::#AMBOSS::-aaDMQ::extra "),
+            (2, " #ak_step1_v12::#amboss::-AADMQ "),
+            (3, " #AK_Step1_v12::#AMBOSS::-aaDMQx ")
+        ]
+        self.assert_agrees(rows, default_prefix("Step1", "AMBOSS"), ["-aaDMQ", "-aadmqx"])
+
+    def test_covers_only_default_prefixes(self):
+        index = core.QuestionIndex()
+        self.assertTrue(index.covers(default_prefix("Step2", "COMLEX")))
+        self.assertFalse(index.covers(default_prefix("Step2", "COMLEX"), "::x"))
+        self.assertFalse(index.covers("#MyDeck::"))
+
+    def test_sync_follows_tags_whatever_the_mtime(self):
+        # Undo restores a note's old mtime and imported notes keep their
+        # source's, so the index must follow tags, not mod
+        prefix = default_prefix("Step2", "UWorld")
+        col = NotesCollection([
+            (1, " #AK_Step2_v12::#UWorld::Step::100 "),
+            (2, " #AK_Step2_v12::#UWorld::Step::200 "),
+            (3, " other ")
+        ])
+        index = core.QuestionIndex()
+        index.update_notes(core.read_question_index_notes(col))
+        col.set_note(1, " other ", 50)
+        col.set_note(2, " #AK_Step2_v12::#UWorld::Step::201 ", 50)
+        col.set_note(3, " #AK_Step2_v12::#UWorld::Step::300 ", 1)
+        col.set_note(4, " #AK_Step2_v12::#UWorld::Step::100 ", 1)
+        self.assertEqual(index.sync_notes(core.read_question_index_notes(col)), 4)
+        ids = ["100", "200", "201", "300"]
+        self.assertEqual(index.lookup(prefix, ids), core.resolve_ids_to_note_ids(col, ids, prefix))
+        self.assertEqual(index.lookup(prefix, ids), {"100": [4], "201": [2], "300": [3]})
+        self.assertEqual(index.sync_notes(core.read_question_index_notes(col)), 0)
+    
+    def test_random_tags_agree_with_resolver(self):
+        rng = random.Random(11)
+        heads = ["#AK_Step1_v12", "#AK_Step2_v12", "#AK_Step3_v12", "#AK_Step2_v11", "Foo::#AK_Step2_v12"]
+        paths = ["#UWorld::Step", "#UWorld", "#AMBOSS", "#UWorld::COMLEX", "#Other"]
+        question_ids = ["1", "12", "123", "abC1", "Step", "-x_"]
+        rows = []
+        for note_id in range(1, 400):
+            tags = []
+            for _ in range(rng.randint(0, 4)):
+                tag = f"{rng.choice(heads)}::{rng.choice(paths)}::{rng.choice(question_ids)}"
+                if rng.random() < 0.3:
+                    tag += "::" + rng.choice(question_ids)
+                if rng.random() < 0.2:
+                    tag = tag.upper()
+                tags.append(tag)
+            rows.append((note_id, " " + " ".join(tags) + " "))
+        for bank in ("UWorld", "AMBOSS", "COMLEX"):
+            for step_type in ("Step1", "Step2", "Step3"):
+                tag_pattern = core.get_tag_pattern(step_type, bank)
+                if tag_pattern is not None:
+                    with self.subTest(bank=bank, step=step_type):
+                        self.assert_agrees(rows, default_prefix(step_type, bank), question_ids)
+
+if __name__ == "__main__":
+    unittest.main()
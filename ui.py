@@ -0,0 +1,2180 @@
+# UWorld AMBOSS COMLEX - Question ID Converter for Anki
+# Dialogs, config and collection wiring; imported on first use by __init__.py
+
+from anki import hooks
+from aqt import mw, gui_hooks
+from aqt.qt import (
+    QAbstractItemView,
+    QApplication,
+    QCheckBox,
+    QComboBox,
+    QDialog,
+    QDialogButtonBox,
+    QFileDialog,
+    QFormLayout,
+    QFrame,
+    QGroupBox,
+    QHBoxLayout,
+    QKeySequence,
+    QLabel,
+    QLineEdit,
+    QMessageBox,
+    QProgressBar,
+    QPushButton,
+    QRadioButton,
+    QShortcut,
+    QSizePolicy,
+    QTabWidget,
+    QTableWidget,
+    QTableWidgetItem,
+    QPlainTextEdit,
+    QTextCursor,
+    QTextEdit,
+    QTimer,
+    QVBoxLayout,
+    QWidget,
+    Qt
+)
+from aqt.utils import showInfo, openLink, tooltip
+from aqt.browser import Browser
+from aqt.operations import QueryOp
+import csv
+import json
+import os
+import threading
+from itertools import islice
+
+from .core import (
+    CSV_DELIMITERS,
+    ConversionCache,
+    HistoryStore,
+    IdTokenModel,
+    QuestionIndex,
+    TIMING_LOG_SIZE,
+    TimingLog,
+    bank_components,
+    build_compressed_tag_query,
+    build_tag_query,
+    count_cards_of_notes,
+    coverage_summary,
+    find_cards_in_chunks,
+    compile_tag_pattern,
+    expand_import_paths,
+    get_tag_pattern,
+    import_id_files,
+    iter_note_tags_for_cards,
+    looks_like_question_ids,
+    make_history_entry,
+    parse_question_ids_from_tags,
+    query_preview,
+    query_term_count,
+    read_ids_from_file,
+    read_question_index_notes,
+    resolve_ids_to_note_ids,
+    sniff_csv,
+    split_ids_by_bank,
+    split_tag_pattern,
+    validate_tag_pattern
+)
+
+# Configuration key for storing user preferences
+CONFIG_KEY = "usmle_converter"
+
+# USMLE Core promo (shown inside addon UI)
+USMLECORE_URL = "https://usmlecore.com/?utm_source=anki-addon&utm_medium=referral&utm_campaign=qid-converter"
+USMLECORE_DISCOUNT_EGP = "USMLEQID"
+USMLECORE_DISCOUNT_USD = "USMLEQIDUSD"
+
+# Auto-convert waits for typing to pause; history waits for the input to settle
+AUTO_CONVERT_DELAY_MS = 500
+HISTORY_SETTLE_DELAY_MS = 3000
+# Searches for more IDs than this run as several bounded chunks (see find_cards_in_chunks)
+SEARCH_CHUNK_THRESHOLD = 1000
+# Inputs longer than this (in characters) are converted off the main thread
+BACKGROUND_CONVERT_THRESHOLD = 50000
+# Config changes are batched and written once the add-on has been idle this long
+CONFIG_FLUSH_DELAY_MS = 2000
+# Conversion history log (user_files survives add-on updates) and its dialog page size
+HISTORY_PATH = os.path.join(os.path.dirname(__file__), "user_files", "history.jsonl")
+HISTORY_PAGE_SIZE = 100
+
+DEFAULT_CONFIG = {
+    "last_selected_step": "Step2",
+    "last_selected_bank": "UWorld",
+    "custom_patterns": {},
+    "resolve_note_ids": False,
+    "compressed_query": False,
+    "mixed_banks": False,
+    "diagnostics_enabled": False
+}
+
+# In-memory config for the session (write-behind, see flush_config)
+_config_cache = None
+_config_dirty = False
+_config_flush_timer = None
+
+# Per-stage timings for the diagnostics view (switched on from the config)
+_timings = TimingLog()
+
+# Recent conversions, shared by every converter dialog of the session
+_conversion_cache = ConversionCache()
+
+# Conversion history, opened on first use (see get_history_store)
+_history_store = None
+
+def get_config():
+    """Get addon configuration with defaults (loaded from disk once per session)"""
+    global _config_cache
+    if _config_cache is not None:
+        return _config_cache
+    
+    config = mw.addonManager.getConfig(__name__)
+    migrated = config is None
+    if config is None:
+        config = {}
+    # Fill in keys missing from older configs
+    for key, value in DEFAULT_CONFIG.items():
+        if key not in config:
+            config[key] = json.loads(json.dumps(value))  # fresh copy of the default
+            migrated = True
+    
+    _config_cache = config
+    _timings.enabled = bool(config.get("diagnostics_enabled"))
+    mw.addonManager.setConfigUpdatedAction(__name__, _on_config_updated)
+    gui_hooks.profile_will_close.append(flush_config)
+    if migrated:
+        save_config(config)
+    return config
+
+def save_config(config):
+    """Save addon configuration (marked dirty, written to disk in a batch)"""
+    global _config_cache, _config_dirty, _config_flush_timer
+    _config_cache = config
+    _config_dirty = True
+    
+    # Restart the idle timer so a burst of changes results in a single write
+    if _config_flush_timer is None:
+        _config_flush_timer = QTimer(mw)
+        _config_flush_timer.setSingleShot(True)
+        _config_flush_timer.setInterval(CONFIG_FLUSH_DELAY_MS)
+        _config_flush_timer.timeout.connect(flush_config)
+    _config_flush_timer.start()
+
+def flush_config():
+    """Write pending config changes to disk"""
+    global _config_dirty
+    if _config_flush_timer is not None:
+        _config_flush_timer.stop()
+    if not _config_dirty:
+        return
+    with _timings.measure("save_config"):
+        mw.addonManager.writeConfig(__name__, _config_cache)
+    _config_dirty = False
+
+def _on_config_updated(config):
+    """Pick up edits made through Anki's add-on config editor"""
+    global _config_cache, _config_dirty
+    _config_cache = config
+    _config_dirty = False
+    _timings.enabled = bool(config.get("diagnostics_enabled"))
+
+# Reverse index (tag prefix, ID) -> note IDs for the open collection.
+# Built in the background on first use, then kept current from Anki's hooks.
+_question_index = None
+_question_index_generation = 0  # bumped when the collection changes
+_question_index_building = False
+_question_index_refreshing = False
+_question_index_refresh_pending = False
+_question_index_hooks_installed = False
+
+def get_question_index():
+    """
+    Return the question index for the open collection, or None while it is
+    still being built (the first call starts the background build).
+    """
+    if _question_index is None:
+        _build_question_index()
+    return _question_index
+
+def plan_note_lookup(ids, step_type, bank, custom_patterns=None):
+    """
+    Split resolving IDs to notes into what the question index answers now
+    and what needs a tag scan of the collection, per bank of a mixed bank.
+    Returns (matches, scans) with scans as [(ids, prefix, suffix)] for
+    resolve_ids_to_note_ids, or None if a custom pattern can't be resolved.
+    """
+    index = get_question_index()
+    matches = {}
+    scans = []
+    for group_bank, group_ids in split_ids_by_bank(ids, bank):
+        if not group_ids:
+            continue
+        tag_pattern = get_tag_pattern(step_type, group_bank, custom_patterns)
+        if tag_pattern is None:
+            # No tags for this bank and step (AMBOSS Step 3): nothing can match
+            continue
+        split = split_tag_pattern(tag_pattern)
+        if split is None:
+            return None
+        if index is not None and index.covers(*split):
+            matches.update(index.lookup(split[0], group_ids))
+            continue
+        scans.append((group_ids, *split))
+    return matches, scans
+
+def run_note_lookup(col, matches, scans):
+    """Finish a plan_note_lookup plan: {id: [note ids]} for every matched ID"""
+    matches = dict(matches)
+    for group_ids, prefix, suffix in scans:
+        matches.update(resolve_ids_to_note_ids(col, group_ids, prefix, suffix))
+    return matches
+
+def _build_question_index():
+    global _question_index_building
+    if _question_index_building or mw.col is None:
+        return
+    _question_index_building = True
+    _install_question_index_hooks()
+    generation = _question_index_generation
+    
+    def build(col):
+        index = QuestionIndex()
+        index.update_notes(read_question_index_notes(col))
+        return index
+    
+    def on_built(index):
+        global _question_index, _question_index_building
+        _question_index_building = False
+        if generation == _question_index_generation:
+            _question_index = index
+    
+    def on_failed(error):
+        global _question_index_building
+        _question_index_building = False
+    
+    QueryOp(parent=mw, op=build, success=on_built).failure(on_failed).run_in_background()
+
+def refresh_question_index():
+    """
+    Re-read the tags of every AnKing-tagged note and fold the differences
+    into the index. Not filtered by mtime: undo restores old mtimes and
+    imported notes keep their source's, so those changes would be missed.
+    """
+    global _question_index_refreshing, _question_index_refresh_pending
+    index = _question_index
+    if index is None or mw.col is None:
+        return
+    if _question_index_refreshing:
+        _question_index_refresh_pending = True
+        return
+    _question_index_refreshing = True
+    
+    def on_fetched(rows):
+        global _question_index_refreshing, _question_index_refresh_pending
+        _question_index_refreshing = False
+        # Notes whose AnKing tags were removed are missing and get dropped
+        if _question_index is index:
+            index.sync_notes(rows)
+        if _question_index_refresh_pending:
+            _question_index_refresh_pending = False
+            refresh_question_index()
+    
+    def on_failed(error):
+        global _question_index_refreshing
+        _question_index_refreshing = False
+    
+    QueryOp(
+        parent=mw,
+        op=read_question_index_notes,
+        success=on_fetched
+    ).failure(on_failed).run_in_background()
+
+def reset_question_index(*args):
+    """Forget the index (collection closed, reloaded or fully synced)"""
+    global _question_index, _question_index_generation, _question_index_building
+    global _question_index_refreshing, _question_index_refresh_pending
+    _question_index = None
+    _question_index_generation += 1
+    _question_index_building = False
+    _question_index_refreshing = False
+    _question_index_refresh_pending = False
+
+def _on_operation_did_execute(changes, handler):
+    if _question_index is not None and (changes.note_text or changes.tag):
+        refresh_question_index()
+
+def _on_notes_will_be_deleted(col, note_ids):
+    note_ids = list(note_ids)
+    
+    def remove():
+        if _question_index is not None:
+            _question_index.remove_notes(note_ids)
+    
+    # May be called from a background operation; touch the index on the main thread
+    mw.taskman.run_on_main(remove)
+
+def _install_question_index_hooks():
+    global _question_index_hooks_installed
+    if _question_index_hooks_installed:
+        return
+    _question_index_hooks_installed = True
+    gui_hooks.operation_did_execute.append(_on_operation_did_execute)
+    gui_hooks.collection_did_load.append(reset_question_index)
+    gui_hooks.sync_did_finish.append(reset_question_index)
+    gui_hooks.profile_will_close.append(reset_question_index)
+    hooks.notes_will_be_deleted.append(_on_notes_will_be_deleted)
+
+def _progress_reporter(label_format):
+    """
+    on_progress(done, total) callback for background work that shows
+    label_format (formatted with done and total) in Anki's progress dialog
+    """
+    def report_progress(done, total):
+        label = label_format.format(done=done, total=total)
+        mw.taskman.run_on_main(lambda: mw.progress.update(label=label, value=done, max=total))
+    return report_progress
+
+def open_browser_search(query):
+    """Open the Browser and run a search"""
+    from aqt import dialogs
+    with _timings.measure("browser_search", query_length=len(query)):
+        browser = dialogs.open("Browser", mw)
+        browser.form.searchEdit.lineEdit().setText(query)
+        browser.onSearchActivated()
+    return browser
+
+def get_history_store():
+    """
+    The conversion history log. Entries still kept in the config by older
+    versions (newest first, preview only) are moved into it once.
+    """
+    global _history_store
+    if _history_store is not None:
+        return _history_store
+    _history_store = HistoryStore(HISTORY_PATH)
+    
+    config = get_config()
+    legacy = config.pop("conversion_history", None)
+    if legacy is not None:
+        _history_store.extend(reversed(legacy))
+        save_config(config)
+    return _history_store
+
+def add_to_history(ids, step_type, bank):
+    """Add conversion to history (one appended line, the config isn't touched)"""
+    get_history_store().append(make_history_entry(ids, step_type, bank))
+
+def show_custom_pattern_dialog(parent):
+    """Show dialog for configuring custom tag patterns"""
+    dialog = QDialog(parent)
+    dialog.setWindowTitle("Custom Tag Patterns")
+    dialog.setMinimumWidth(700)
+    
+    layout = QVBoxLayout()
+    
+    # Instructions
+    instructions = QLabel("""
+    Define custom tag patterns for your decks. Use {ID} as placeholder for question IDs
+    (it may appear more than once, e.g. tag:#A::{ID} OR tag:#B::{ID}).
+    Patterns are organized by Question Bank and Step.
+    
+    Examples:
+    - tag:#MyDeck::#UWorld::{ID}
+    - tag:#CustomStep1::Question::{ID}
+    - tag:UWorld_{ID}
+    """)
+    instructions.setWordWrap(True)
+    layout.addWidget(instructions)
+    
+    # Load current config
+    config = get_config()
+    custom_patterns = config.get("custom_patterns", {})
+    
+    # Pattern inputs organized by bank
+    tabs = QTabWidget()
+    
+    # UWorld Tab
+    uworld_widget = QWidget()
+    uworld_layout = QFormLayout()
+    
+    uworld_step1 = QLineEdit(custom_patterns.get("UWorld_Step1", ""))
+    uworld_step1.setPlaceholderText("tag:#AK_Step1_v12::#UWorld::Step::{ID}")
+    uworld_layout.addRow("Step 1:", uworld_step1)
+    
+    uworld_step2 = QLineEdit(custom_patterns.get("UWorld_Step2", ""))
+    uworld_step2.setPlaceholderText("tag:#AK_Step2_v12::#UWorld::Step::{ID}")
+    uworld_layout.addRow("Step 2:", uworld_step2)
+    
+    uworld_step3 = QLineEdit(custom_patterns.get("UWorld_Step3", ""))
+    uworld_step3.setPlaceholderText("tag:#AK_Step3_v12::#UWorld::{ID}")
+    uworld_layout.addRow("Step 3:", uworld_step3)
+    
+    uworld_widget.setLayout(uworld_layout)
+    tabs.addTab(uworld_widget, "UWorld")
+    
+    # AMBOSS Tab
+    amboss_widget = QWidget()
+    amboss_layout = QFormLayout()
+    
+    amboss_step1 = QLineEdit(custom_patterns.get("AMBOSS_Step1", ""))
+    amboss_step1.setPlaceholderText("tag:#AK_Step1_v12::#AMBOSS::{ID}")
+    amboss_layout.addRow("Step 1:", amboss_step1)
+    
+    amboss_step2 = QLineEdit(custom_patterns.get("AMBOSS_Step2", ""))
+    amboss_step2.setPlaceholderText("tag:#AK_Step2_v12::#AMBOSS::{ID}")
+    amboss_layout.addRow("Step 2:", amboss_step2)
+    
+    amboss_note = QLabel("Note: Step 3 not available for AMBOSS")
+    amboss_note.setStyleSheet("color: gray; font-style: italic;")
+    amboss_layout.addRow("", amboss_note)
+    
+    amboss_widget.setLayout(amboss_layout)
+    tabs.addTab(amboss_widget, "AMBOSS")
+    
+    # COMLEX Tab
+    comlex_widget = QWidget()
+    comlex_layout = QFormLayout()
+    
+    comlex_step1 = QLineEdit(custom_patterns.get("COMLEX_Step1", ""))
+    comlex_step1.setPlaceholderText("tag:#AK_Step1_v12::#UWorld::COMLEX::{ID}")
+    comlex_layout.addRow("Step 1:", comlex_step1)
+    
+    comlex_step2 = QLineEdit(custom_patterns.get("COMLEX_Step2", ""))
+    comlex_step2.setPlaceholderText("tag:#AK_Step2_v12::#UWorld::COMLEX::{ID}")
+    comlex_layout.addRow("Step 2:", comlex_step2)
+    
+    comlex_note = QLabel("Note: Step 3 not available for COMLEX")
+    comlex_note.setStyleSheet("color: gray; font-style: italic;")
+    comlex_layout.addRow("", comlex_note)
+    
+    comlex_widget.setLayout(comlex_layout)
+    tabs.addTab(comlex_widget, "COMLEX")
+    
+    layout.addWidget(tabs)
+    
+    # Problems with the entered patterns (saving is blocked until they're fixed)
+    errors_label = QLabel("")
+    errors_label.setWordWrap(True)
+    errors_label.setStyleSheet("color: #d32f2f;")
+    errors_label.hide()
+    layout.addWidget(errors_label)
+    
+    # Test section
+    test_group = QGroupBox("Test Pattern:")
+    test_layout = QVBoxLayout()
+    
+    test_input = QLineEdit()
+    test_input.setPlaceholderText("Enter test ID (e.g., 12345 for UWorld/COMLEX or -aaDMQ for AMBOSS)")
+    test_layout.addWidget(test_input)
+    
+    test_result = QLabel("")
+    test_result.setWordWrap(True)
+    test_result.setStyleSheet("""
+        QLabel {
+            padding: 10px;
+            border: 1px solid palette(mid);
+            border-radius: 5px;
+            background-color: palette(base);
+        }
+    """)
+    test_layout.addWidget(test_result)
+    
+    test_group.setLayout(test_layout)
+    layout.addWidget(test_group)
+    
+    # Buttons
+    button_layout = QHBoxLayout()
+    
+    reset_btn = QPushButton("Reset to Defaults")
+    save_btn = QPushButton("Save")
+    cancel_btn = QPushButton("Cancel")
+    
+    button_layout.addWidget(reset_btn)
+    button_layout.addStretch()
+    button_layout.addWidget(save_btn)
+    button_layout.addWidget(cancel_btn)
+    
+    layout.addLayout(button_layout)
+    dialog.setLayout(layout)
+    
+    # Store all input fields
+    all_inputs = {
+        "UWorld_Step1": uworld_step1,
+        "UWorld_Step2": uworld_step2,
+        "UWorld_Step3": uworld_step3,
+        "AMBOSS_Step1": amboss_step1,
+        "AMBOSS_Step2": amboss_step2,
+        "COMLEX_Step1": comlex_step1,
+        "COMLEX_Step2": comlex_step2
+    }
+    
+    def test_pattern():
+        test_id = test_input.text().strip()
+        if not test_id:
+            test_result.setText("Enter a test ID to preview")
+            return
+        
+        # Test patterns from current tab
+        current_tab_name = tabs.tabText(tabs.currentIndex())
+        results = []
+        
+        for key, input_field in all_inputs.items():
+            if key.startswith(current_tab_name):
+                pattern = input_field.text().strip()
+                step = key.split('_')[1]
+                
+                if pattern:
+                    errors = validate_tag_pattern(pattern)
+                    if errors:
+                        results.append(f"<b>{step}:</b> <span style='color: #d32f2f;'>{'; '.join(errors)}</span>")
+                    else:
+                        result = compile_tag_pattern(pattern).render(test_id)
+                        results.append(f"<b>{step}:</b> {result}")
+                else:
+                    # Show default pattern
+                    default = get_tag_pattern(step, current_tab_name)
+                    if default:
+                        result = compile_tag_pattern(default).render(test_id)
+                        results.append(f"<b>{step} (default):</b> {result}")
+        
+        if results:
+            test_result.setText("<br>".join(results))
+        else:
+            test_result.setText("No patterns to test")
+    
+    def pattern_errors():
+        """Validation messages for the non-empty patterns, one line per field"""
+        messages = []
+        for key, input_field in all_inputs.items():
+            pattern = input_field.text().strip()
+            errors = validate_tag_pattern(pattern) if pattern else []
+            input_field.setStyleSheet("border: 1px solid #d32f2f;" if errors else "")
+            if errors:
+                bank, step = key.split('_')
+                messages.append(f"{bank} {step}: {'; '.join(errors)}")
+        return messages
+    
+    def validate_patterns():
+        messages = pattern_errors()
+        errors_label.setText("\n".join(messages))
+        errors_label.setVisible(bool(messages))
+        save_btn.setEnabled(not messages)
+    
+    def reset_patterns():
+        for input_field in all_inputs.values():
+            input_field.clear()
+        test_result.setText("Patterns reset to defaults")
+    
+    def save_patterns():
+        if pattern_errors():
+            validate_patterns()
+            return
+        config = get_config()
+        
+        # Save only non-empty patterns, compiled now so conversions reuse them
+        new_patterns = {}
+        for key, input_field in all_inputs.items():
+            if input_field.text().strip():
+                new_patterns[key] = input_field.text().strip()
+                compile_tag_pattern(new_patterns[key])
+        
+        config["custom_patterns"] = new_patterns
+        save_config(config)
+        
+        tooltip("Custom patterns saved!")
+        dialog.accept()
+    
+    # Connect signals
+    test_input.textChanged.connect(lambda: test_pattern())
+    tabs.currentChanged.connect(lambda: test_pattern() if test_input.text().strip() else None)
+    
+    for input_field in all_inputs.values():
+        input_field.textChanged.connect(lambda: test_pattern() if test_input.text().strip() else None)
+        input_field.textChanged.connect(validate_patterns)
+    
+    reset_btn.clicked.connect(reset_patterns)
+    save_btn.clicked.connect(save_patterns)
+    cancel_btn.clicked.connect(dialog.reject)
+    
+    # Flag problems in patterns saved earlier (or edited in the config file)
+    validate_patterns()
+    dialog.exec()
+
+def show_csv_options_dialog(parent, file_path, detect_per_file=False):
+    """
+    Ask which CSV column and delimiter hold the IDs.
+    Returns (column, delimiter, skip_header) or None if cancelled. With
+    detect_per_file (batch imports) the delimiter can be left on "Detected
+    per file", returned as None; the preview then uses file_path's.
+    """
+    try:
+        delimiter, has_header = sniff_csv(file_path)
+    except Exception as e:
+        showInfo(f"Error reading file: {str(e)}")
+        return None
+    
+    dialog = QDialog(parent)
+    dialog.setWindowTitle("CSV Import Options")
+    dialog.setMinimumWidth(500)
+    
+    layout = QVBoxLayout()
+    form = QFormLayout()
+    
+    delimiter_combo = QComboBox()
+    if detect_per_file:
+        delimiter_combo.addItem("Detected per file", None)
+    for name, value in CSV_DELIMITERS.items():
+        delimiter_combo.addItem(name, value)
+    if not detect_per_file and delimiter in CSV_DELIMITERS.values():
+        delimiter_combo.setCurrentIndex(list(CSV_DELIMITERS.values()).index(delimiter))
+    form.addRow("Delimiter:", delimiter_combo)
+    
+    column_combo = QComboBox()
+    form.addRow("Column with IDs:", column_combo)
+    
+    header_checkbox = QCheckBox("First row is a header")
+    header_checkbox.setChecked(has_header)
+    form.addRow("", header_checkbox)
+    
+    layout.addLayout(form)
+    
+    preview = QLabel("")
+    preview.setStyleSheet("color: gray; font-family: monospace;")
+    preview.setWordWrap(True)
+    layout.addWidget(preview)
+    
+    button_box = QDialogButtonBox(
+        QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel
+    )
+    button_box.accepted.connect(dialog.accept)
+    button_box.rejected.connect(dialog.reject)
+    layout.addWidget(button_box)
+    dialog.setLayout(layout)
+    
+    def refresh_columns():
+        """Re-read the first rows with the chosen delimiter"""
+        with open(file_path, 'r', encoding='utf-8-sig', newline='') as f:
+            rows = list(islice(csv.reader(f, delimiter=delimiter_combo.currentData() or delimiter), 5))
+        
+        column_combo.clear()
+        column_combo.addItem("All columns", None)
+        width = max((len(row) for row in rows), default=0)
+        for index in range(width):
+            sample = rows[0][index] if rows and index < len(rows[0]) else ""
+            column_combo.addItem(f"Column {index + 1}: {sample[:30]}", index)
+        if width > 1:
+            column_combo.setCurrentIndex(1)
+        preview.setText("<br>".join(
+            " | ".join(cell[:20] for cell in row) for row in rows
+        ))
+    
+    refresh_columns()
+    delimiter_combo.currentIndexChanged.connect(lambda: refresh_columns())
+    
+    if not dialog.exec():
+        return None
+    return column_combo.currentData(), delimiter_combo.currentData(), header_checkbox.isChecked()
+
+def load_ids_from_file(parent, bank, on_loaded):
+    """
+    Load question IDs from one or more text or CSV files.
+    Files are streamed in the background and only the extracted IDs are
+    passed to on_loaded(ids); the raw file text is never held in memory.
+    """
+    file_paths, _ = QFileDialog.getOpenFileNames(
+        parent,
+        "Select File(s) with Question IDs",
+        "",
+        "Text Files (*.txt);;CSV Files (*.csv *.tsv);;All Files (*.*)"
+    )
+    
+    if not file_paths:
+        return
+    if len(file_paths) > 1:
+        load_ids_from_files(parent, bank, file_paths, on_loaded)
+        return
+    file_path = file_paths[0]
+    
+    csv_options = None
+    if file_path.lower().endswith((".csv", ".tsv")):
+        csv_options = show_csv_options_dialog(parent, file_path)
+        if csv_options is None:
+            return
+    
+    def read_ids():
+        return read_ids_from_file(file_path, bank, csv_options)
+    
+    def on_done(future):
+        try:
+            ids = future.result()
+        except Exception as e:
+            showInfo(f"Error reading file: {str(e)}")
+            return
+        on_loaded(ids)
+    
+    mw.taskman.with_progress(read_ids, on_done, parent=parent, label="Reading question IDs...")
+
+def load_ids_from_folder(parent, bank, on_loaded):
+    """Load question IDs from every text and CSV file in a folder (and its subfolders)"""
+    folder = QFileDialog.getExistingDirectory(parent, "Select Folder with Question ID Files")
+    if not folder:
+        return
+    file_paths = expand_import_paths([folder])
+    if not file_paths:
+        showInfo("No .txt, .csv or .tsv files found in this folder.")
+        return
+    load_ids_from_files(parent, bank, file_paths, on_loaded)
+
+def load_ids_from_files(parent, bank, file_paths, on_loaded):
+    """
+    Read several files in parallel in the background, then report per-file
+    counts and errors and pass the merged, deduplicated IDs to on_loaded.
+    CSV options are asked once, from the first CSV file, and apply to all
+    CSV files; the delimiter is detected per file unless one is chosen, so
+    folders mixing .csv and .tsv exports still parse.
+    """
+    csv_options = None
+    csv_paths = [path for path in file_paths if path.lower().endswith((".csv", ".tsv"))]
+    if csv_paths:
+        csv_options = show_csv_options_dialog(parent, csv_paths[0], detect_per_file=True)
+        if csv_options is None:
+            return
+    
+    def read_files():
+        with _timings.measure("import_files", files=len(file_paths)) as details:
+            result = import_id_files(
+                file_paths, bank, csv_options,
+                on_progress=_progress_reporter("Reading question IDs... {done}/{total} files"),
+                should_cancel=mw.progress.want_cancel
+            )
+            details["ids"] = sum(len(ids) for ids in result[0].values())
+        return result
+    
+    def on_done(future):
+        try:
+            ids_by_bank, file_results, cancelled = future.result()
+        except Exception as e:
+            showInfo(f"Error reading files: {str(e)}")
+            return
+        if cancelled:
+            tooltip("Import cancelled")
+            return
+        show_import_report(parent, ids_by_bank, file_results)
+        on_loaded([question_id for ids in ids_by_bank.values() for question_id in ids])
+    
+    mw.taskman.with_progress(
+        read_files, on_done, parent=parent,
+        label=f"Reading question IDs from {len(file_paths)} files..."
+    )
+
+def show_import_report(parent, ids_by_bank, file_results):
+    """Show how many IDs each imported file had and which files failed or had none"""
+    dialog = QDialog(parent)
+    dialog.setWindowTitle("Import Results")
+    dialog.setMinimumSize(600, 350)
+    
+    layout = QVBoxLayout()
+    
+    failed = sum(1 for result in file_results if result["error"])
+    empty = sum(1 for result in file_results if not result["error"] and not result["count"])
+    summary = f"{len(file_results) - failed} of {len(file_results)} files read · "
+    if empty:
+        summary += f"{empty} with no IDs · "
+    summary += " · ".join(f"{bank}: {len(ids)} unique IDs" for bank, ids in ids_by_bank.items())
+    summary_label = QLabel(summary)
+    summary_label.setStyleSheet("font-weight: bold;" + (" color: #d97706;" if failed or empty else ""))
+    layout.addWidget(summary_label)
+    
+    table = QTableWidget()
+    table.setColumnCount(3)
+    table.setHorizontalHeaderLabels(["File", "IDs", "Error"])
+    table.setRowCount(len(file_results))
+    table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+    for i, result in enumerate(file_results):
+        name_item = QTableWidgetItem(os.path.basename(result["path"]))
+        name_item.setToolTip(result["path"])
+        table.setItem(i, 0, name_item)
+        table.setItem(i, 1, QTableWidgetItem(str(result["count"])))
+        if result["error"]:
+            problem = result["error"]
+        elif not result["count"]:
+            problem = "No IDs found (check the CSV column and header settings)"
+        else:
+            problem = ""
+        table.setItem(i, 2, QTableWidgetItem(problem))
+    table.resizeColumnsToContents()
+    layout.addWidget(table)
+    
+    close_btn = QPushButton("Close")
+    close_btn.clicked.connect(dialog.accept)
+    button_layout = QHBoxLayout()
+    button_layout.addStretch()
+    button_layout.addWidget(close_btn)
+    layout.addLayout(button_layout)
+    
+    dialog.setLayout(layout)
+    dialog.exec()
+
+def show_history_dialog(parent, on_rerun=None):
+    """
+    Show conversion history a page at a time, newest first. on_rerun, if
+    given, is called with the selected entry to convert its IDs again.
+    """
+    store = get_history_store()
+    
+    if not len(store):
+        showInfo("No conversion history yet.")
+        return
+    
+    dialog = QDialog(parent)
+    dialog.setWindowTitle("Conversion History")
+    dialog.setMinimumSize(600, 400)
+    
+    layout = QVBoxLayout()
+    
+    # Create table
+    table = QTableWidget()
+    table.setColumnCount(5)
+    table.setHorizontalHeaderLabels(["Time", "Bank", "Step", "IDs Preview", "Count"])
+    table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+    table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+    table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+    layout.addWidget(table)
+    
+    # Paging
+    page_layout = QHBoxLayout()
+    prev_btn = QPushButton("◀ Newer")
+    page_label = QLabel()
+    next_btn = QPushButton("Older ▶")
+    page_layout.addWidget(prev_btn)
+    page_layout.addStretch()
+    page_layout.addWidget(page_label)
+    page_layout.addStretch()
+    page_layout.addWidget(next_btn)
+    layout.addLayout(page_layout)
+    
+    # Buttons
+    button_layout = QHBoxLayout()
+    rerun_btn = QPushButton("🔄 Re-run")
+    rerun_btn.setToolTip("Convert the selected entry's IDs again with its bank and step")
+    rerun_btn.setVisible(on_rerun is not None)
+    copy_ids_btn = QPushButton("📋 Copy IDs")
+    clear_btn = QPushButton("Clear History")
+    close_btn = QPushButton("Close")
+    
+    button_layout.addWidget(rerun_btn)
+    button_layout.addWidget(copy_ids_btn)
+    button_layout.addWidget(clear_btn)
+    button_layout.addStretch()
+    button_layout.addWidget(close_btn)
+    
+    layout.addLayout(button_layout)
+    dialog.setLayout(layout)
+    
+    page = {"start": 0, "entries": []}
+    
+    def show_page(start):
+        """Read and show one page of entries, start entries from the newest"""
+        from datetime import datetime
+        total = len(store)
+        page["start"] = start
+        page["entries"] = entries = store.page(start, HISTORY_PAGE_SIZE)
+        table.setRowCount(len(entries))
+        for i, entry in enumerate(entries):
+            # Parse timestamp
+            try:
+                dt = datetime.fromisoformat(entry["timestamp"])
+                time_str = dt.strftime("%Y-%m-%d %H:%M")
+            except (KeyError, TypeError, ValueError):
+                time_str = entry.get("timestamp", "")
+            
+            table.setItem(i, 0, QTableWidgetItem(time_str))
+            # Default to UWorld for old entries; mixed banks read "UWorld + AMBOSS"
+            table.setItem(i, 1, QTableWidgetItem(entry.get("bank", "UWorld").replace("+", " + ")))
+            table.setItem(i, 2, QTableWidgetItem(entry.get("step", "")))
+            table.setItem(i, 3, QTableWidgetItem(entry.get("ids_preview", "")))
+            table.setItem(i, 4, QTableWidgetItem(str(entry.get("count", ""))))
+        table.resizeColumnsToContents()
+        
+        page_label.setText(f"Entries {start + 1:,}–{start + len(entries):,} of {total:,}")
+        prev_btn.setEnabled(start > 0)
+        next_btn.setEnabled(start + HISTORY_PAGE_SIZE < total)
+        update_buttons()
+    
+    def selected_entry():
+        row = table.currentRow()
+        if 0 <= row < len(page["entries"]) and table.selectionModel().hasSelection():
+            return page["entries"][row]
+        return None
+    
+    def update_buttons():
+        entry = selected_entry()
+        # Entries migrated from the config only kept a preview, not the IDs
+        has_ids = entry is not None and bool(entry.get("ids"))
+        rerun_btn.setEnabled(has_ids)
+        copy_ids_btn.setEnabled(has_ids)
+    
+    def rerun_clicked():
+        entry = selected_entry()
+        if entry is None or not entry.get("ids"):
+            return
+        dialog.accept()
+        on_rerun(entry)
+    
+    def copy_ids_clicked():
+        entry = selected_entry()
+        if entry is None or not entry.get("ids"):
+            return
+        QApplication.clipboard().setText(", ".join(entry["ids"]))
+        tooltip(f"Copied {len(entry['ids'])} ID(s) to clipboard!")
+    
+    def clear_history():
+        reply = QMessageBox.question(
+            dialog,
+            "Clear History",
+            "Are you sure you want to clear all conversion history?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        if reply == QMessageBox.StandardButton.Yes:
+            store.clear()
+            dialog.accept()
+            tooltip("History cleared!")
+    
+    prev_btn.clicked.connect(lambda: show_page(max(page["start"] - HISTORY_PAGE_SIZE, 0)))
+    next_btn.clicked.connect(lambda: show_page(page["start"] + HISTORY_PAGE_SIZE))
+    table.itemSelectionChanged.connect(update_buttons)
+    if on_rerun is not None:
+        table.cellDoubleClicked.connect(lambda row, column: rerun_clicked())
+    rerun_btn.clicked.connect(rerun_clicked)
+    copy_ids_btn.clicked.connect(copy_ids_clicked)
+    clear_btn.clicked.connect(clear_history)
+    close_btn.clicked.connect(dialog.accept)
+    
+    show_page(0)
+    dialog.exec()
+
+def show_diagnostics_dialog(parent):
+    """Show recent stage timings and export them as JSON for bug reports"""
+    dialog = QDialog(parent)
+    dialog.setWindowTitle("Diagnostics")
+    dialog.setMinimumSize(600, 400)
+    
+    layout = QVBoxLayout()
+    
+    enabled_checkbox = QCheckBox("Record timings (parsing, query building, rendering, config writes, searches)")
+    enabled_checkbox.setChecked(_timings.enabled)
+    layout.addWidget(enabled_checkbox)
+    
+    # Create table
+    table = QTableWidget()
+    table.setColumnCount(5)
+    table.setHorizontalHeaderLabels(["Time", "Stage", "ms", "IDs", "Query Length"])
+    table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+    table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+    layout.addWidget(table)
+    
+    summary_label = QLabel()
+    summary_label.setStyleSheet("color: gray; font-size: 10px;")
+    layout.addWidget(summary_label)
+    
+    # Buttons
+    button_layout = QHBoxLayout()
+    refresh_btn = QPushButton("Refresh")
+    export_btn = QPushButton("Export JSON...")
+    clear_btn = QPushButton("Clear")
+    close_btn = QPushButton("Close")
+    
+    button_layout.addWidget(refresh_btn)
+    button_layout.addWidget(export_btn)
+    button_layout.addWidget(clear_btn)
+    button_layout.addStretch()
+    button_layout.addWidget(close_btn)
+    
+    layout.addLayout(button_layout)
+    dialog.setLayout(layout)
+    
+    def populate():
+        from datetime import datetime
+        # Newest first
+        entries = _timings.entries()[::-1]
+        table.setRowCount(len(entries))
+        for i, entry in enumerate(entries):
+            time_str = datetime.fromtimestamp(entry["time"]).strftime("%H:%M:%S")
+            table.setItem(i, 0, QTableWidgetItem(time_str))
+            table.setItem(i, 1, QTableWidgetItem(entry["stage"]))
+            table.setItem(i, 2, QTableWidgetItem(f"{entry['ms']:.1f}"))
+            table.setItem(i, 3, QTableWidgetItem(str(entry.get("ids", ""))))
+            table.setItem(i, 4, QTableWidgetItem(str(entry.get("query_length", ""))))
+        table.resizeColumnsToContents()
+        
+        if entries:
+            summary_label.setText(f"{len(entries)} most recent timing(s), up to {TIMING_LOG_SIZE} kept")
+        elif _timings.enabled:
+            summary_label.setText("No timings yet - convert or search some IDs")
+        else:
+            summary_label.setText("Timing is off - tick the box above to start recording")
+    
+    def toggle_enabled(checked):
+        _timings.enabled = checked
+        config = get_config()
+        config["diagnostics_enabled"] = checked
+        save_config(config)
+        populate()
+    
+    def export_json():
+        file_path, _ = QFileDialog.getSaveFileName(
+            dialog,
+            "Export Diagnostics",
+            "question-id-converter-diagnostics.json",
+            "JSON files (*.json)"
+        )
+        if not file_path:
+            return
+        try:
+            with open(file_path, "w", encoding="utf-8") as f:
+                f.write(_timings.to_json())
+        except OSError as e:
+            showInfo(f"Error exporting diagnostics: {str(e)}")
+            return
+        tooltip("Diagnostics exported!")
+    
+    def clear_timings():
+        _timings.clear()
+        populate()
+    
+    enabled_checkbox.toggled.connect(toggle_enabled)
+    refresh_btn.clicked.connect(populate)
+    export_btn.clicked.connect(export_json)
+    clear_btn.clicked.connect(clear_timings)
+    close_btn.clicked.connect(dialog.accept)
+    
+    populate()
+    dialog.exec()
+
+def show_usmlecore_dialog(parent):
+    """Show an in-addon promo dialog for USMLE Core (non-intrusive, user-initiated)."""
+    dialog = QDialog(parent)
+    dialog.setWindowTitle("USMLE Core — Addon User Perks")
+    dialog.setMinimumWidth(640)
+
+    layout = QVBoxLayout()
+
+    header = QLabel(
+        """
+        <div style="font-size: 20px; font-weight: 800; letter-spacing: 0.5px;">
+          USMLE<span style="color:#6d28d9;">CORE</span>
+        </div>
+        <div style="margin-top:6px; color:#6b7280; font-size: 12px;">
+          Practice that feels like the real exam — with Test Mode, Tutor Mode, and AI.
+        </div>
+        """
+    )
+    header.setTextFormat(Qt.TextFormat.RichText)
+    header.setWordWrap(True)
+    layout.addWidget(header)
+
+    card = QFrame()
+    card.setStyleSheet(
+        """
+        QFrame {
+            background-color: #0b1220;
+            border: 1px solid #1f2a44;
+            border-radius: 12px;
+        }
+        QLabel { color: #e5e7eb; }
+        """
+    )
+    card_layout = QVBoxLayout(card)
+
+    highlights = QLabel(
+        """
+        <div style="font-size: 12px; line-height: 1.5;">
+          <div style="font-weight:700; margin-bottom:6px;">Why addon users love it</div>
+          • AI Tutor while solving questions (context-aware)<br/>
+          • One-click Anki tag search copy (skip manual tagging)<br/>
+          • Community + study partner search<br/>
+          • Analytics to track performance and weak areas
+        </div>
+        """
+    )
+    highlights.setTextFormat(Qt.TextFormat.RichText)
+    highlights.setWordWrap(True)
+    card_layout.addWidget(highlights)
+
+    perks = QLabel(
+        f"""
+        <div style="margin-top:10px; font-size:12px; line-height:1.5;">
+          <div style="font-weight:700; margin-bottom:6px;">Exclusive discount codes for this addon</div>
+          <div style="color:#93c5fd; margin-bottom:6px;">
+            Limited: first 20 users get the full discount (after that, discounts may be reduced).
+          </div>
+          <div style="color:#cbd5e1;">
+            • <span style="font-family:monospace; font-weight:700; color:#a78bfa;">{USMLECORE_DISCOUNT_EGP}</span>
+            — 5000 EGP off<br/>
+            • <span style="font-family:monospace; font-weight:700; color:#a78bfa;">{USMLECORE_DISCOUNT_USD}</span>
+            — $50 off
+          </div>
+        </div>
+        """
+    )
+    perks.setTextFormat(Qt.TextFormat.RichText)
+    perks.setWordWrap(True)
+    card_layout.addWidget(perks)
+
+    layout.addWidget(card)
+
+    def copy_code(code: str):
+        QApplication.clipboard().setText(code)
+        tooltip(f"Copied: {code}")
+
+    buttons = QHBoxLayout()
+
+    open_btn = QPushButton("Open USMLECORE.com")
+    open_btn.setStyleSheet(
+        """
+        QPushButton {
+            background-color: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+                stop:0 #6d28d9, stop:1 #2563eb);
+            color: white;
+            font-weight: 800;
+            border-radius: 8px;
+            padding: 10px 14px;
+            border: none;
+        }
+        QPushButton:hover {
+            background-color: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+                stop:0 #7c3aed, stop:1 #3b82f6);
+        }
+        QPushButton:pressed {
+            background-color: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+                stop:0 #5b21b6, stop:1 #1d4ed8);
+        }
+        """
+    )
+    open_btn.clicked.connect(lambda: openLink(USMLECORE_URL))
+
+    copy_egp_btn = QPushButton(f"Copy {USMLECORE_DISCOUNT_EGP}")
+    copy_egp_btn.setToolTip("Copies the EGP discount code to clipboard")
+    copy_egp_btn.setStyleSheet(
+        """
+        QPushButton {
+            background-color: #111827;
+            color: #e5e7eb;
+            font-weight: 700;
+            border-radius: 8px;
+            padding: 10px 12px;
+            border: 1px solid #1f2a44;
+        }
+        QPushButton:hover { background-color: #0f172a; }
+        QPushButton:pressed { background-color: #0b1220; }
+        """
+    )
+    copy_egp_btn.clicked.connect(lambda: copy_code(USMLECORE_DISCOUNT_EGP))
+
+    copy_usd_btn = QPushButton(f"Copy {USMLECORE_DISCOUNT_USD}")
+    copy_usd_btn.setToolTip("Copies the USD discount code to clipboard")
+    copy_usd_btn.setStyleSheet(
+        """
+        QPushButton {
+            background-color: #111827;
+            color: #e5e7eb;
+            font-weight: 700;
+            border-radius: 8px;
+            padding: 10px 12px;
+            border: 1px solid #1f2a44;
+        }
+        QPushButton:hover { background-color: #0f172a; }
+        QPushButton:pressed { background-color: #0b1220; }
+        """
+    )
+    copy_usd_btn.clicked.connect(lambda: copy_code(USMLECORE_DISCOUNT_USD))
+
+    buttons.addWidget(open_btn)
+    buttons.addSpacing(6)
+    buttons.addWidget(copy_egp_btn)
+    buttons.addWidget(copy_usd_btn)
+
+    layout.addLayout(buttons)
+
+    footer = QLabel(
+        """
+        <div style="margin-top:8px; color:#6b7280; font-size:11px;">
+          Tip: If you love this addon, you'll love the built-in Anki integration inside USMLE Core.
+        </div>
+        """
+    )
+    footer.setTextFormat(Qt.TextFormat.RichText)
+    footer.setWordWrap(True)
+    layout.addWidget(footer)
+
+    dialog.setLayout(layout)
+    dialog.exec()
+
+def show_converter_dialog():
+    """
+    Show the main converter dialog
+    """
+    dialog = QDialog(mw)
+    dialog.setWindowTitle("UWorld AMBOSS COMLEX - Question ID Converter")
+    dialog.setFixedSize(850, 600)
+    
+    # Main layout
+    main_layout = QVBoxLayout()
+    
+    # Top bar with support buttons and new feature buttons
+    top_bar = QHBoxLayout()
+    
+    # Left side - feature buttons
+    history_btn = QPushButton("📊 History")
+    history_btn.setToolTip("View conversion history")
+    history_btn.clicked.connect(lambda: show_history_dialog(dialog, on_rerun=rerun_history_entry))
+    
+    custom_pattern_btn = QPushButton("⚙️ Custom Patterns")
+    custom_pattern_btn.setToolTip("Configure custom tag patterns")
+    custom_pattern_btn.clicked.connect(lambda: show_custom_pattern_dialog(dialog))
+    
+    file_btn = QPushButton("📁 Load from File")
+    file_btn.setToolTip("Load question IDs from one or more files")
+    
+    folder_btn = QPushButton("🗂️ Load Folder")
+    folder_btn.setToolTip("Load and merge question IDs from every .txt/.csv file in a folder")
+    
+    diagnostics_btn = QPushButton("⏱️ Diagnostics")
+    diagnostics_btn.setToolTip("Show how long recent conversions and searches took")
+    diagnostics_btn.clicked.connect(lambda: show_diagnostics_dialog(dialog))
+    
+    top_bar.addWidget(history_btn)
+    top_bar.addWidget(custom_pattern_btn)
+    top_bar.addWidget(file_btn)
+    top_bar.addWidget(folder_btn)
+    top_bar.addWidget(diagnostics_btn)
+    top_bar.addStretch()
+    
+    # Right side - promo + review
+    usmlecore_btn = QPushButton("Studying USMLE? Try USMLE Core!")
+    usmlecore_btn.setToolTip("USMLE Core + exclusive addon discounts + built-in Anki integration")
+    usmlecore_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+    usmlecore_btn.setMinimumWidth(260)
+    usmlecore_btn.setSizePolicy(QSizePolicy.Policy.MinimumExpanding, QSizePolicy.Policy.Fixed)
+    usmlecore_btn.setStyleSheet(
+        """
+        QPushButton {
+            background-color: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+                stop:0 #6d28d9, stop:1 #2563eb);
+            color: white;
+            font-weight: 800;
+            border-radius: 6px;
+            padding: 6px 10px;
+            border: none;
+            font-size: 11px;
+        }
+        QPushButton:hover {
+            background-color: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+                stop:0 #7c3aed, stop:1 #3b82f6);
+        }
+        QPushButton:pressed {
+            background-color: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+                stop:0 #5b21b6, stop:1 #1d4ed8);
+        }
+        """
+    )
+    usmlecore_btn.clicked.connect(lambda: show_usmlecore_dialog(dialog))
+    
+    # Review button
+    review_btn = QPushButton("⭐ Rate Addon")
+    review_btn.setStyleSheet("""
+        QPushButton {
+            background-color: #ffa500;
+            color: white;
+            font-weight: bold;
+            border-radius: 5px;
+            padding: 6px 12px;
+            border: none;
+            font-size: 11px;
+        }
+        QPushButton:hover {
+            background-color: #ff8c00;
+        }
+        QPushButton:pressed {
+            background-color: #e67e00;
+        }
+    """)
+    review_btn.clicked.connect(lambda: openLink("https://ankiweb.net/shared/review/699193084"))
+    
+    top_bar.addWidget(usmlecore_btn)
+    top_bar.addSpacing(10)
+    top_bar.addWidget(review_btn)
+    
+    main_layout.addLayout(top_bar)
+    main_layout.addSpacing(10)
+    
+    # Instructions
+    instructions = QLabel("""
+    Paste your question IDs below (supports multiple formats):
+    • UWorld/COMLEX: Comma, space, or newline separated numbers (e.g., 21656, 19263)
+    • AMBOSS: Alphanumeric IDs with hyphens (e.g., -aaDMQ, 0jae_4, 3_0SLi)
+    """)
+    main_layout.addWidget(instructions)
+    
+    # Keyboard shortcuts hint
+    shortcuts_hint = QLabel("💡 Shortcuts: Ctrl+Shift+U (open) | Ctrl+Enter (search) | Esc (close) | Auto-loads clipboard!")
+    shortcuts_hint.setStyleSheet("color: gray; font-size: 10px; font-style: italic;")
+    main_layout.addWidget(shortcuts_hint)
+    
+    # Question Bank selection
+    bank_group = QGroupBox("Select Question Bank:")
+    bank_layout = QHBoxLayout()
+    
+    uworld_radio = QRadioButton("UWorld")
+    amboss_radio = QRadioButton("AMBOSS")
+    comlex_radio = QRadioButton("COMLEX")
+    
+    # Load saved preference
+    config = get_config()
+    last_bank = config.get("last_selected_bank", "UWorld")
+    if last_bank == "AMBOSS":
+        amboss_radio.setChecked(True)
+    elif last_bank == "COMLEX":
+        comlex_radio.setChecked(True)
+    else:
+        uworld_radio.setChecked(True)
+    
+    bank_layout.addWidget(uworld_radio)
+    bank_layout.addWidget(amboss_radio)
+    bank_layout.addWidget(comlex_radio)
+    
+    # Mixed lists: letters mark AMBOSS IDs, digits go to the numeric bank above
+    mixed_checkbox = QCheckBox("Mixed with AMBOSS")
+    mixed_checkbox.setToolTip(
+        "Input mixes AMBOSS IDs with UWorld (or COMLEX) IDs: IDs with a letter are "
+        "searched as AMBOSS, all-digit IDs as the selected bank, in one query"
+    )
+    mixed_checkbox.setChecked(config.get("mixed_banks", False))
+    bank_layout.addWidget(mixed_checkbox)
+    bank_group.setLayout(bank_layout)
+    main_layout.addWidget(bank_group)
+    
+    # Step selection
+    step_group = QGroupBox("Select USMLE Step:")
+    step_layout = QHBoxLayout()
+    
+    step1_radio = QRadioButton("Step 1")
+    step2_radio = QRadioButton("Step 2")
+    step3_radio = QRadioButton("Step 3")
+    
+    # Load saved preference
+    last_step = config.get("last_selected_step", "Step2")
+    if last_step == "Step1":
+        step1_radio.setChecked(True)
+    elif last_step == "Step3":
+        step3_radio.setChecked(True)
+    else:
+        step2_radio.setChecked(True)
+    
+    step_layout.addWidget(step1_radio)
+    step_layout.addWidget(step2_radio)
+    step_layout.addWidget(step3_radio)
+    step_group.setLayout(step_layout)
+    main_layout.addWidget(step_group)
+    
+    # Search mode
+    nid_search_checkbox = QCheckBox("Search by note ID (faster for large lists)")
+    nid_search_checkbox.setToolTip(
+        "Look the IDs up in your collection first and open the Browser with a short nid: search"
+    )
+    nid_search_checkbox.setChecked(config.get("resolve_note_ids", False))
+    
+    compressed_checkbox = QCheckBox("Compact query (one tag:re: search)")
+    compressed_checkbox.setToolTip(
+        "Write the shared tag prefix once and list the IDs in a single regex tag search"
+    )
+    compressed_checkbox.setChecked(config.get("compressed_query", False))
+    
+    mode_layout = QHBoxLayout()
+    mode_layout.addWidget(nid_search_checkbox)
+    mode_layout.addWidget(compressed_checkbox)
+    mode_layout.addStretch()
+    main_layout.addLayout(mode_layout)
+    
+    # Input text area
+    input_text = QTextEdit()
+    input_text.setPlaceholderText("Paste your question IDs here (any format: comma, space, or newline separated)...")
+    input_text.setMaximumHeight(100)
+    main_layout.addWidget(input_text)
+    
+    # Stats label
+    stats_label = QLabel("Ready to convert")
+    stats_label.setStyleSheet("color: gray; font-style: italic;")
+    main_layout.addWidget(stats_label)
+    
+    # Background conversion progress (large inputs only)
+    progress_widget = QWidget()
+    progress_layout = QHBoxLayout()
+    progress_layout.setContentsMargins(0, 0, 0, 0)
+    progress_bar = QProgressBar()
+    progress_bar.setRange(0, 0)  # busy indicator
+    progress_bar.setTextVisible(False)
+    cancel_convert_btn = QPushButton("Cancel")
+    progress_layout.addWidget(progress_bar)
+    progress_layout.addWidget(cancel_convert_btn)
+    progress_widget.setLayout(progress_layout)
+    progress_widget.hide()
+    main_layout.addWidget(progress_widget)
+    
+    # Coverage: how many of the converted IDs exist in the collection
+    coverage_layout = QHBoxLayout()
+    coverage_label = QLabel("")
+    coverage_label.setStyleSheet("color: gray;")
+    copy_missing_btn = QPushButton("Copy Missing IDs")
+    copy_missing_btn.setToolTip("Copy the IDs that weren't found in your collection")
+    copy_missing_btn.setEnabled(False)
+    coverage_layout.addWidget(coverage_label)
+    coverage_layout.addStretch()
+    coverage_layout.addWidget(copy_missing_btn)
+    main_layout.addLayout(coverage_layout)
+    
+    # Output text area
+    output_label = QLabel("Anki search query:")
+    main_layout.addWidget(output_label)
+    
+    # Plain-text view of a bounded preview; the full query is kept in state["query"]
+    output_text = QPlainTextEdit()
+    output_text.setReadOnly(True)
+    main_layout.addWidget(output_text)
+    
+    # Conversion state shared by the callbacks below
+    state = {
+        "generation": 0,  # bumped on every input/selection change
+        "pending_history": None,  # last auto-conversion, recorded once input settles
+        "cancel_event": None,  # set to cancel the running background conversion
+        "ids": [],  # IDs of the last successful conversion
+        "query": "",  # its full search query (the output box may show a preview)
+        "missing": [],  # of those, IDs not found in the collection
+        "bank": None,
+        "step": None,
+        "tokens": IdTokenModel(),  # parsed input, updated edit by edit
+        "tokens_current": True,  # False once the model has lost track of the input
+        "loading_tokens": False  # True while input is set from an already-loaded model
+    }
+    
+    # Current selection display
+    def get_radio_bank():
+        if uworld_radio.isChecked():
+            return "UWorld"
+        elif amboss_radio.isChecked():
+            return "AMBOSS"
+        else:
+            return "COMLEX"
+    
+    def get_selected_bank():
+        bank = get_radio_bank()
+        if mixed_checkbox.isChecked():
+            return "COMLEX+AMBOSS" if bank == "COMLEX" else "UWorld+AMBOSS"
+        return bank
+    
+    def get_bank_name():
+        return get_selected_bank().replace("+", " + ")
+    
+    def get_step_name():
+        if step1_radio.isChecked():
+            return "Step 1"
+        elif step3_radio.isChecked():
+            return "Step 3"
+        else:
+            return "Step 2"
+    
+    current_step_label = QLabel(f"Current selection: {get_bank_name()} - {get_step_name()}")
+    current_step_label.setStyleSheet("color: blue; font-weight: bold;")
+    main_layout.addWidget(current_step_label)
+    
+    # Function to update Step 3 availability
+    def update_step3_availability():
+        bank = get_bank_name()
+        if get_selected_bank() != "UWorld":
+            # Disable Step 3 for AMBOSS and COMLEX, and mixed input (its
+            # AMBOSS IDs have no Step 3 tags and would be dropped)
+            step3_radio.setEnabled(False)
+            step3_radio.setToolTip("Step 3 not available for " + bank)
+            # If Step 3 was selected, switch to Step 2
+            if step3_radio.isChecked():
+                step2_radio.setChecked(True)
+        else:
+            # Enable Step 3 for UWorld
+            step3_radio.setEnabled(True)
+            step3_radio.setToolTip("")
+    
+    # Set initial Step 3 availability
+    update_step3_availability()
+    
+    # Bottom buttons
+    button_layout = QHBoxLayout()
+    
+    convert_btn = QPushButton("Convert")
+    copy_btn = QPushButton("Copy to Clipboard")
+    search_btn = QPushButton("Search in Anki")
+    close_btn = QPushButton("Close")
+    
+    button_layout.addWidget(convert_btn)
+    button_layout.addWidget(copy_btn)
+    button_layout.addWidget(search_btn)
+    button_layout.addWidget(close_btn)
+    
+    main_layout.addLayout(button_layout)
+    dialog.setLayout(main_layout)
+    
+    def get_selected_step():
+        if step1_radio.isChecked():
+            return "Step1"
+        elif step3_radio.isChecked():
+            return "Step3"
+        else:
+            return "Step2"
+    
+    def save_preferences():
+        """Save the current step and bank selection"""
+        config = get_config()
+        config["last_selected_step"] = get_selected_step()
+        config["last_selected_bank"] = get_radio_bank()
+        config["mixed_banks"] = mixed_checkbox.isChecked()
+        config["resolve_note_ids"] = nid_search_checkbox.isChecked()
+        config["compressed_query"] = compressed_checkbox.isChecked()
+        save_config(config)
+    
+    def update_labels():
+        bank = get_bank_name()
+        step = get_step_name()
+        current_step_label.setText(f"Current selection: {bank} - {step}")
+        # Save preferences when changed
+        save_preferences()
+        # Update Step 3 availability
+        update_step3_availability()
+        # Auto-convert when selection changes (only if text exists).
+        # Both toggled signals of a radio switch collapse into one conversion.
+        if input_text.toPlainText().strip():
+            state["generation"] += 1
+            auto_convert_timer.start(0)
+    
+    def convert_clicked(auto_convert=False):
+        # An explicit or timer-driven conversion supersedes any pending one
+        auto_convert_timer.stop()
+        cancel_background_conversion()
+        generation = state["generation"]
+        text = input_text.toPlainText()
+        ids_text = text.strip()
+        if not ids_text:
+            # Only show popup if manually clicked (not auto-convert)
+            if not auto_convert:
+                showInfo("Please enter some question IDs first.")
+            return
+        
+        step_type = get_selected_step()
+        bank = get_selected_bank()
+        config = get_config()
+        custom_patterns = config.get("custom_patterns", {})
+        compressed = compressed_checkbox.isChecked()
+        
+        def apply(result):
+            apply_conversion(result, generation, step_type, bank, auto_convert)
+        
+        # Same input and settings as a recent conversion: reuse its result
+        with _timings.measure("cache_lookup", chars=len(ids_text)) as details:
+            cache_key = conversion_cache_key(ids_text, step_type, bank, custom_patterns, compressed)
+            result = _conversion_cache.get(cache_key)
+            details["hit"] = result is not None
+        if result is not None:
+            apply(result)
+            return
+        
+        # The token model already holds the parsed input (or small inputs are
+        # re-parsed right away): convert on the main thread
+        large = len(text) > BACKGROUND_CONVERT_THRESHOLD
+        tokens_current = sync_tokens(text)
+        if tokens_current and not (large and compressed):
+            try:
+                result = state["tokens"].convert(step_type, custom_patterns, compressed, timings=_timings)
+            except Exception as e:
+                show_conversion_error(e, auto_convert)
+                return
+            _conversion_cache.put(cache_key, result)
+            apply(result)
+            return
+        
+        # Large inputs: parse and/or build the compact query in a worker
+        # thread, only the result comes back
+        cancel_event = threading.Event()
+        state["cancel_event"] = cancel_event
+        progress_widget.show()
+        stats_label.setText("Converting large input in the background...")
+        stats_label.setStyleSheet("color: gray; font-style: italic;")
+        
+        if tokens_current:
+            # The model is up to date: only the (slow) compact query is left
+            ids = state["tokens"].ids()
+            
+            def convert_in_background():
+                with _timings.measure("build_query", ids=len(ids)) as details:
+                    query = build_compressed_tag_query(ids, step_type, bank, custom_patterns)
+                    details["query_length"] = len(query)
+                return None, (ids, query)
+        else:
+            def convert_in_background():
+                tokens = IdTokenModel(bank)
+                with _timings.measure("parse", chars=len(text)) as details:
+                    if not tokens.set_text(text, should_cancel=cancel_event.is_set):
+                        return None
+                    details["ids"] = tokens.count
+                return tokens, tokens.convert(step_type, custom_patterns, compressed, timings=_timings)
+        
+        def on_done(future):
+            if state["cancel_event"] is cancel_event:
+                state["cancel_event"] = None
+                progress_widget.hide()
+            if cancel_event.is_set():
+                return
+            try:
+                result = future.result()
+            except Exception as e:
+                if generation == state["generation"]:
+                    show_conversion_error(e, auto_convert)
+                return
+            if result is None or generation != state["generation"]:
+                return
+            tokens, result = result
+            if tokens is not None:
+                # No edits since: the new model matches the input and follows later edits
+                state["tokens"] = tokens
+                state["tokens_current"] = True
+            _conversion_cache.put(cache_key, result)
+            apply(result)
+        
+        mw.taskman.run_in_background(convert_in_background, on_done)
+    
+    def conversion_cache_key(ids_text, step_type, bank, custom_patterns, compressed):
+        tag_pattern = tuple(
+            get_tag_pattern(step_type, component, custom_patterns)
+            for component in bank_components(bank)
+        )
+        return ConversionCache.key(ids_text, bank, step_type, tag_pattern, compressed)
+    
+    def rerun_history_entry(entry):
+        """Select the entry's bank and step and convert its stored IDs again"""
+        bank = entry.get("bank", "UWorld")
+        step_type = entry.get("step", "Step2")
+        radio_bank, _, mixed = bank.partition("+")
+        {"AMBOSS": amboss_radio, "COMLEX": comlex_radio}.get(radio_bank, uworld_radio).setChecked(True)
+        mixed_checkbox.setChecked(bool(mixed))
+        # Step 3 stays disabled (entry re-run on Step 2) where the bank has none
+        if step_type == "Step3" and not step3_radio.isEnabled():
+            step_type = "Step2"
+        {"Step1": step1_radio, "Step3": step3_radio}.get(step_type, step2_radio).setChecked(True)
+        bank = get_selected_bank()
+        step_type = get_selected_step()
+        
+        # The IDs are already parsed: load them into the token model and build
+        # the query from them, so the conversion below finds it in the cache
+        # and neither setPlainText nor the conversion re-parses the text
+        ids = entry["ids"]
+        ids_text = "\n".join(ids)
+        custom_patterns = get_config().get("custom_patterns", {})
+        compressed = compressed_checkbox.isChecked()
+        build_query = build_compressed_tag_query if compressed else build_tag_query
+        try:
+            query = build_query(ids, step_type, bank, custom_patterns)
+        except Exception as e:
+            show_conversion_error(e, False)
+            return
+        _conversion_cache.put(
+            conversion_cache_key(ids_text, step_type, bank, custom_patterns, compressed),
+            (ids, query)
+        )
+        tokens = IdTokenModel(bank)
+        tokens.set_ids(ids)
+        state["tokens"] = tokens
+        state["tokens_current"] = True
+        state["loading_tokens"] = True
+        try:
+            input_text.setPlainText(ids_text)
+        finally:
+            state["loading_tokens"] = False
+        convert_clicked()
+    
+    def sync_tokens(text=None):
+        """
+        Rebuild the token model if it lost track of the input or the bank
+        changed (main thread). Returns False, leaving it to the background
+        conversion, if the input is too large to re-parse here.
+        """
+        bank = get_selected_bank()
+        if state["tokens_current"] and state["tokens"].bank == bank:
+            return True
+        if text is None:
+            text = input_text.toPlainText()
+        if len(text) > BACKGROUND_CONVERT_THRESHOLD:
+            state["tokens_current"] = False
+            return False
+        tokens = IdTokenModel(bank)
+        with _timings.measure("parse", chars=len(text)) as details:
+            tokens.set_text(text)
+            details["ids"] = tokens.count
+        state["tokens"] = tokens
+        state["tokens_current"] = True
+        return True
+    
+    def on_contents_change(position, removed, added):
+        """Apply one edit of the input to the token model"""
+        if state["loading_tokens"] or not state["tokens_current"]:
+            return
+        document = input_text.document()
+        length = document.characterCount() - 1
+        # Big pastes are parsed with the rest of a large input in the background
+        if added > BACKGROUND_CONVERT_THRESHOLD or position + added > length:
+            state["tokens_current"] = False
+            return
+        cursor = QTextCursor(document)
+        cursor.setPosition(position)
+        cursor.setPosition(position + added, QTextCursor.MoveMode.KeepAnchor)
+        # Paragraph breaks come back as U+2029; toPlainText() gives newlines
+        added_text = cursor.selectedText().replace("\u2029", "\n")
+        try:
+            with _timings.measure("parse_edit", chars=added):
+                state["tokens"].apply_edit(position, removed, added_text)
+        except ValueError:
+            state["tokens_current"] = False
+            return
+        # Qt reports some whole-document changes with off-by-one counts
+        if len(state["tokens"]) != length:
+            state["tokens_current"] = False
+    
+    def apply_conversion(result, generation, step_type, bank, auto_convert):
+        """Show a finished conversion (main thread only)"""
+        # Drop the result if it was cancelled or the input changed meanwhile
+        if result is None or generation != state["generation"]:
+            return
+        ids, converted = result
+        
+        try:
+            # Check if conversion failed (Step 3 not available or no valid IDs)
+            if not converted:
+                # Only show error for Step 3 unavailability if manually clicked
+                if step_type == "Step3" and bank in ["AMBOSS", "COMLEX"] and not auto_convert:
+                    showInfo(f"Step 3 is not available for {bank}. Please select Step 1 or Step 2.")
+                # For invalid IDs during auto-convert, just clear output silently
+                clear_output()
+                state["ids"] = []
+                clear_coverage()
+                stats_label.setText("No valid IDs found")
+                stats_label.setStyleSheet("color: gray; font-style: italic;")
+                return
+            
+            with _timings.measure("render", ids=len(ids), query_length=len(converted)):
+                show_query(converted)
+            state["ids"] = ids
+            state["bank"] = bank
+            state["step"] = step_type
+            update_coverage(ids, step_type, bank, generation)
+            
+            # Update stats
+            id_count = len(ids)
+            if id_count > 0:
+                stats_text = f"✓ Converted {id_count} question ID(s)"
+                if len(bank_components(bank)) > 1:
+                    stats_text += " (" + " · ".join(
+                        f"{group_bank}: {len(group_ids)}"
+                        for group_bank, group_ids in split_ids_by_bank(ids, bank)
+                    ) + ")"
+                stats_label.setText(stats_text)
+                stats_label.setStyleSheet("color: green; font-weight: bold;")
+                
+                # Add to history; auto-converts wait until the input settles
+                if auto_convert:
+                    state["pending_history"] = (ids, step_type, bank)
+                    history_timer.start()
+                else:
+                    discard_pending_history()
+                    add_to_history(ids, step_type, bank)
+            else:
+                stats_label.setText("No valid IDs found")
+                stats_label.setStyleSheet("color: gray; font-style: italic;")
+            
+        except Exception as e:
+            show_conversion_error(e, auto_convert)
+    
+    def clear_coverage():
+        state["missing"] = []
+        coverage_label.setText("")
+        copy_missing_btn.setEnabled(False)
+    
+    def update_coverage(ids, step_type, bank, generation):
+        """Look up which IDs exist in the collection and show found/missing counts"""
+        clear_coverage()
+        custom_patterns = get_config().get("custom_patterns", {})
+        
+        # In-memory index when it applies, else one bulk tag scan of the notes
+        plan = plan_note_lookup(ids, step_type, bank, custom_patterns)
+        if plan is None:
+            coverage_label.setText("Coverage isn't available for this custom pattern")
+            return
+        
+        coverage_label.setText("Checking your collection...")
+        
+        def compute(col):
+            summary = coverage_summary(ids, run_note_lookup(col, *plan))
+            summary["card_count"] = count_cards_of_notes(col, summary["note_ids"])
+            return summary
+        
+        def on_done(summary):
+            if generation != state["generation"]:
+                return
+            found = len(summary["found"])
+            missing = summary["missing"]
+            state["missing"] = missing
+            text = (
+                f"In your collection: {found}/{found + len(missing)} IDs found · "
+                f"{len(summary['note_ids'])} notes · {summary['card_count']} cards"
+            )
+            if missing:
+                text += f" · {len(missing)} missing"
+            coverage_label.setText(text)
+            coverage_label.setStyleSheet("color: green;" if not missing else "color: #d97706;")
+            copy_missing_btn.setEnabled(bool(missing))
+        
+        def on_failed(error):
+            if generation == state["generation"]:
+                coverage_label.setText(f"Coverage check failed: {error}")
+        
+        QueryOp(parent=dialog, op=compute, success=on_done).failure(on_failed).run_in_background()
+    
+    def copy_missing_clicked():
+        if state["missing"]:
+            QApplication.clipboard().setText(", ".join(state["missing"]))
+            tooltip(f"Copied {len(state['missing'])} missing ID(s) to clipboard!")
+    
+    def show_conversion_error(e, auto_convert):
+        # Only show error popup if manually clicked
+        if not auto_convert:
+            showInfo(f"Error converting IDs: {str(e)}")
+        stats_label.setText(f"✗ Error: {str(e)}")
+        stats_label.setStyleSheet("color: red; font-weight: bold;")
+    
+    def cancel_background_conversion():
+        """Stop waiting for a running background conversion; True if one was running"""
+        cancel_event = state["cancel_event"]
+        if cancel_event is None:
+            return False
+        cancel_event.set()
+        state["cancel_event"] = None
+        progress_widget.hide()
+        return True
+    
+    def cancel_convert_clicked():
+        if cancel_background_conversion():
+            stats_label.setText("Conversion cancelled")
+            stats_label.setStyleSheet("color: gray; font-style: italic;")
+    
+    def flush_pending_conversion():
+        """
+        Run a still-queued auto-convert now so actions see the latest input.
+        Returns False while a background conversion is still running.
+        """
+        if auto_convert_timer.isActive():
+            convert_clicked(auto_convert=True)
+        if state["cancel_event"] is not None:
+            tooltip("Still converting, please wait...")
+            return False
+        return True
+    
+    def discard_pending_history():
+        history_timer.stop()
+        state["pending_history"] = None
+    
+    def flush_pending_history():
+        pending = state["pending_history"]
+        discard_pending_history()
+        if pending:
+            add_to_history(*pending)
+    
+    def show_query(query):
+        """Keep the full query and show a bounded preview of it"""
+        state["query"] = query
+        output_text.setPlainText(query_preview(query))
+        output_label.setText(
+            f"Anki search query ({query_term_count(query):,} terms, {len(query):,} characters):"
+        )
+    
+    def clear_output():
+        state["query"] = ""
+        output_text.clear()
+        output_label.setText("Anki search query:")
+    
+    def copy_clicked():
+        if not flush_pending_conversion():
+            return
+        converted_text = state["query"]
+        if not converted_text:
+            showInfo("Nothing to copy. Please convert some IDs first.")
+            return
+        
+        clipboard = QApplication.clipboard()
+        clipboard.setText(converted_text)
+        flush_pending_history()
+        bank = get_bank_name()
+        step = get_step_name()
+        tooltip(f"Search query for {bank} - {step} copied to clipboard!")
+    
+    def search_clicked():
+        if not flush_pending_conversion():
+            return
+        converted_text = state["query"]
+        if not converted_text:
+            showInfo("Nothing to search. Please convert some IDs first.")
+            return
+        flush_pending_history()
+        
+        if nid_search_checkbox.isChecked() and search_by_note_ids():
+            return
+        
+        if len(state["ids"]) > SEARCH_CHUNK_THRESHOLD:
+            search_in_chunks()
+            return
+        
+        # Open the browser and set the search
+        open_browser_search(converted_text)
+        dialog.close()
+    
+    def search_in_chunks():
+        """Run a large search chunk by chunk in the background, then show the merged cards"""
+        ids = state["ids"]
+        step_type = state["step"]
+        bank = state["bank"]
+        custom_patterns = get_config().get("custom_patterns", {})
+        compressed = compressed_checkbox.isChecked()
+        
+        def run_search(col):
+            with _timings.measure("chunked_search", ids=len(ids)) as details:
+                card_ids, cancelled = find_cards_in_chunks(
+                    col, ids, step_type, bank, custom_patterns, compressed=compressed,
+                    on_progress=_progress_reporter("Searching... {done}/{total} IDs"),
+                    should_cancel=mw.progress.want_cancel
+                )
+                details["cards"] = len(card_ids)
+            return card_ids, cancelled
+        
+        def on_searched(result):
+            card_ids, cancelled = result
+            if cancelled:
+                tooltip("Search cancelled")
+                return
+            if not card_ids:
+                tooltip("No cards with these question IDs found in your collection")
+                return
+            open_browser_search("cid:" + ",".join(map(str, card_ids)))
+            dialog.close()
+        
+        def on_failed(error):
+            show_conversion_error(error, False)
+        
+        QueryOp(
+            parent=dialog,
+            op=run_search,
+            success=on_searched
+        ).failure(on_failed).with_progress(f"Searching {len(ids)} question IDs...").run_in_background()
+    
+    def search_by_note_ids():
+        """
+        Resolve the converted IDs to note IDs in the background, then open the
+        Browser with a compact nid: search. Returns False if the current tag
+        pattern can't be resolved this way (caller falls back to tag search).
+        """
+        custom_patterns = get_config().get("custom_patterns", {})
+        ids = state["ids"]
+        with _timings.measure("index_lookup", ids=len(ids)):
+            plan = plan_note_lookup(ids, state["step"], state["bank"], custom_patterns)
+        if plan is None:
+            tooltip("Custom pattern can't be searched by note ID - using tag search")
+            return False
+        matches, scans = plan
+        
+        def on_resolved(matches):
+            note_ids = sorted({nid for nids in matches.values() for nid in nids})
+            if not note_ids:
+                tooltip("No notes with these question IDs found in your collection")
+                return
+            open_browser_search("nid:" + ",".join(map(str, note_ids)))
+            dialog.close()
+        
+        # The in-memory index answered everything: no collection scan needed
+        if not scans:
+            on_resolved(matches)
+            return True
+        
+        def resolve(col):
+            with _timings.measure("resolve_note_ids", ids=len(ids)):
+                return run_note_lookup(col, matches, scans)
+        
+        QueryOp(
+            parent=dialog,
+            op=resolve,
+            success=on_resolved
+        ).with_progress("Looking up question IDs...").run_in_background()
+        return True
+    
+    def close_clicked():
+        # Save preferences when closing (just in case)
+        save_preferences()
+        dialog.close()
+    
+    def on_dialog_finished():
+        # Record the last settled auto-conversion, stop pending work and
+        # write the batched config changes
+        auto_convert_timer.stop()
+        cancel_background_conversion()
+        flush_pending_history()
+        flush_config()
+    
+    def on_ids_loaded(ids):
+        if not ids:
+            tooltip("No question IDs found in file")
+            return
+        # Only the parsed ID list goes into the input box
+        input_text.setPlainText("\n".join(ids))
+        tooltip(f"File loaded! {len(ids)} IDs ready to convert.")
+    
+    def load_file_clicked():
+        """Load IDs from one or more files"""
+        load_ids_from_file(dialog, get_selected_bank(), on_ids_loaded)
+    
+    def load_folder_clicked():
+        """Load IDs from every ID file in a folder"""
+        load_ids_from_folder(dialog, get_selected_bank(), on_ids_loaded)
+    
+    # Connect main action buttons
+    convert_btn.clicked.connect(convert_clicked)
+    copy_btn.clicked.connect(copy_clicked)
+    search_btn.clicked.connect(search_clicked)
+    close_btn.clicked.connect(close_clicked)
+    file_btn.clicked.connect(load_file_clicked)
+    folder_btn.clicked.connect(load_folder_clicked)
+    cancel_convert_btn.clicked.connect(cancel_convert_clicked)
+    copy_missing_btn.clicked.connect(copy_missing_clicked)
+    
+    # Debounce timers: restarting them drops the earlier, now stale requests
+    auto_convert_timer = QTimer(dialog)
+    auto_convert_timer.setSingleShot(True)
+    auto_convert_timer.timeout.connect(lambda: convert_clicked(auto_convert=True))
+    
+    history_timer = QTimer(dialog)
+    history_timer.setSingleShot(True)
+    history_timer.setInterval(HISTORY_SETTLE_DELAY_MS)
+    history_timer.timeout.connect(flush_pending_history)
+    
+    dialog.finished.connect(on_dialog_finished)
+    
+    # Auto-convert when text changes (once typing pauses)
+    def on_text_changed():
+        # Every edit invalidates conversions that are queued or in flight
+        state["generation"] += 1
+        cancel_background_conversion()
+        # Update stats preview from the token model (large inputs it lost track
+        # of are only counted by the background conversion)
+        text = input_text.toPlainText()
+        if not text or text.isspace():
+            # Clear output when input is empty
+            auto_convert_timer.stop()
+            discard_pending_history()
+            clear_output()
+            clear_coverage()
+            stats_label.setText("Ready to convert")
+            stats_label.setStyleSheet("color: gray; font-style: italic;")
+        elif sync_tokens(text):
+            stats_label.setText(f"Found {state['tokens'].count} ID(s) - auto-converting...")
+            stats_label.setStyleSheet("color: gray; font-style: italic;")
+            auto_convert_timer.start(AUTO_CONVERT_DELAY_MS)
+        else:
+            stats_label.setText("Large input - auto-converting...")
+            stats_label.setStyleSheet("color: gray; font-style: italic;")
+            auto_convert_timer.start(AUTO_CONVERT_DELAY_MS)
+    
+    input_text.document().contentsChange.connect(on_contents_change)
+    input_text.textChanged.connect(on_text_changed)
+    
+    # Auto-load from clipboard if it contains potential IDs (AFTER textChanged is connected)
+    clipboard = QApplication.clipboard()
+    clipboard_text = clipboard.text()
+    
+    # The check only looks at a bounded prefix, so a huge clipboard costs nothing extra
+    if looks_like_question_ids(clipboard_text):
+        input_text.setPlainText(clipboard_text.strip())
+        # Show tooltip
+        QTimer.singleShot(100, lambda: tooltip("📋 Clipboard content auto-loaded!", period=2000))
+    
+    # Connect bank radio buttons
+    uworld_radio.toggled.connect(update_labels)
+    amboss_radio.toggled.connect(update_labels)
+    comlex_radio.toggled.connect(update_labels)
+    mixed_checkbox.toggled.connect(update_labels)
+    
+    # Connect step radio buttons
+    step1_radio.toggled.connect(update_labels)
+    step2_radio.toggled.connect(update_labels)
+    step3_radio.toggled.connect(update_labels)
+    
+    # Remember the search mode; the query format also re-converts
+    nid_search_checkbox.toggled.connect(save_preferences)
+    compressed_checkbox.toggled.connect(update_labels)
+    
+    # Setup dialog keyboard shortcuts
+    # Ctrl+Enter: Convert and search immediately
+    search_shortcut = QShortcut(QKeySequence("Ctrl+Return"), dialog)
+    search_shortcut.activated.connect(search_clicked)
+    
+    # Esc: Close dialog (already handled by Qt, but making it explicit)
+    close_shortcut = QShortcut(QKeySequence("Esc"), dialog)
+    close_shortcut.activated.connect(close_clicked)
+    
+    # Build the question index in the background (or catch up on edits)
+    if get_question_index() is not None:
+        refresh_question_index()
+    
+    dialog.show()
+
+def extract_question_ids(browser: Browser, card_ids):
+    """Extract UWorld/AMBOSS/COMLEX question IDs from selected cards"""
+    if not card_ids:
+        return
+    card_ids = list(card_ids)
+    
+    QueryOp(
+        parent=browser,
+        op=lambda col: parse_question_ids_from_tags(
+            iter_note_tags_for_cards(
+                col, card_ids, on_progress=_progress_reporter("Reading tags... {done}/{total} cards")
+            )
+        ),
+        success=copy_extracted_ids
+    ).with_progress("Extracting question IDs...").run_in_background()
+
+def copy_extracted_ids(extracted_ids):
+    """Copy extracted IDs to the clipboard and report counts per bank"""
+    # Build result message
+    all_ids = []
+    result_parts = []
+    
+    for bank, ids in extracted_ids.items():
+        if ids:
+            all_ids.extend(ids)
+            result_parts.append(f"{bank}: {len(ids)}")
+    
+    if all_ids:
+        # Copy all IDs to clipboard (separated by commas)
+        id_text = ", ".join(all_ids)
+        clipboard = QApplication.clipboard()
+        clipboard.setText(id_text)
+        
+        count = len(all_ids)
+        banks_info = " (" + ", ".join(result_parts) + ")"
+        if count == 1:
+            tooltip(f"Copied question ID: {id_text}")
+        else:
+            tooltip(f"Copied {count} question IDs{banks_info} to clipboard!")
+    else:
+        tooltip("No question IDs found in selected card(s)")